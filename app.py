@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from pathlib import Path
+from bisect import bisect_right
 
 import altair as alt
 import numpy as np
@@ -12,25 +12,17 @@ from src.analysis import (
     analyze_overrun_causes,
     apply_filters,
     calculate_overall_metrics,
+    compute_all_summaries,
     compute_builder_task_stats,
-    compute_department_summary,
-    compute_job_summary,
-    compute_monthly_by_department,
-    compute_monthly_summary,
-    compute_product_summary,
     compute_reconciliation_totals,
-    compute_task_summary,
     diagnose_job_margin,
     generate_insights,
     get_available_departments,
     get_available_fiscal_years,
     get_available_products,
-    get_loss_making_jobs,
-    get_underquoted_jobs,
-    get_unquoted_tasks,
     prepare_fact_for_analysis,
 )
-from src.app_state import get_data, sidebar_base_controls
+from src.app_state import DATA_KEY_ATTR, get_data, sidebar_base_controls
 
 
 st.set_page_config(page_title="Job Profitability Analysis", layout="wide", initial_sidebar_state="expanded")
@@ -142,14 +134,15 @@ st.markdown(
 )
 
 
+CURRENCY_THRESHOLDS = (1_000, 1_000_000)
+CURRENCY_SCALES = ((1, "{:,.0f}", ""), (1_000, "{:,.1f}", "K"), (1_000_000, "{:,.2f}", "M"))
+
+
 def fmt_currency(val: float) -> str:
     if pd.isna(val) or val == 0:
         return "$0"
-    if abs(val) >= 1_000_000:
-        return f"${val/1_000_000:,.2f}M"
-    if abs(val) >= 1_000:
-        return f"${val/1_000:,.1f}K"
-    return f"${val:,.0f}"
+    divisor, spec, suffix = CURRENCY_SCALES[bisect_right(CURRENCY_THRESHOLDS, abs(val))]
+    return "$" + spec.format(val / divisor) + suffix
 
 
 def fmt_pct(val: float) -> str:
@@ -160,6 +153,22 @@ def fmt_rate(val: float) -> str:
     return f"${val:,.0f}/hr" if pd.notna(val) and val > 0 else "N/A"
 
 
+def category_options(values: pd.Series) -> list[str]:
+    return values.cat.remove_unused_categories().cat.categories.tolist()
+
+
+def top_rows(df: pd.DataFrame, column: str, n: int, ascending: bool) -> pd.DataFrame:
+    values = df[column].to_numpy()
+    if not ascending:
+        values = -values
+    if len(values) > n:
+        idx = np.argpartition(values, n)[:n]
+        idx = idx[np.argsort(values[idx], kind="stable")]
+    else:
+        idx = np.argsort(values, kind="stable")
+    return df.iloc[idx]
+
+
 def hero(title: str, subtitle: str, pills: list[str]) -> None:
     pill_html = "".join([f"<span class='pill'>{p}</span>" for p in pills])
     st.markdown(
@@ -247,14 +256,58 @@ def apply_chart_theme() -> None:
     alt.themes.enable("profit_theme")
 
 
+# The loaded fact is a shared cache resource, so the prepared frame is shared too
+# and both caches key on the data key get_data tags it with rather than hashing
+# the full table. Object ids are not used: a freed frame's id can be reused by
+# another dataset.
+@st.cache_resource(show_spinner=False, max_entries=4)
+def prepare_fact(_fact: pd.DataFrame, data_key: str) -> pd.DataFrame:
+    return prepare_fact_for_analysis(_fact)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def filter_fact(
+    _fact: pd.DataFrame,
+    data_key: str,
+    exclude_sg_allocation: bool,
+    billable_only: bool,
+    fiscal_year: int | None,
+    department: str | None,
+):
+    return apply_filters(
+        _fact,
+        exclude_sg_allocation=exclude_sg_allocation,
+        billable_only=billable_only,
+        fiscal_year=fiscal_year,
+        department=department,
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def builder_task_stats(
+    fact_keys: pd.DataFrame,
+    _timesheet_task_month: pd.DataFrame,
+    data_key: str,
+    department: str | None,
+    product: str | None,
+) -> pd.DataFrame:
+    return compute_builder_task_stats(
+        fact=fact_keys,
+        timesheet_task_month=_timesheet_task_month,
+        department=department,
+        product=product,
+    )
+
+
 @st.cache_data(show_spinner=False)
 def compute_summaries(df_filtered: pd.DataFrame):
-    dept_summary = compute_department_summary(df_filtered)
-    product_summary = compute_product_summary(df_filtered)
-    job_summary = compute_job_summary(df_filtered)
-    task_summary = compute_task_summary(df_filtered)
-    monthly_summary = compute_monthly_summary(df_filtered)
-    monthly_by_dept = compute_monthly_by_department(df_filtered)
+    summaries = compute_all_summaries(df_filtered)
+    dept_summary = summaries["department"]
+    product_summary = summaries["product"]
+    job_summary = summaries["job"]
+    task_summary = summaries["task"]
+    monthly_summary = summaries["monthly"]
+    monthly_by_dept = summaries["monthly_by_department"]
     metrics = calculate_overall_metrics(job_summary)
     causes = analyze_overrun_causes(task_summary)
     insights = generate_insights(job_summary, dept_summary, monthly_summary, task_summary)
@@ -271,6 +324,509 @@ def compute_summaries(df_filtered: pd.DataFrame):
     )
 
 
+@st.fragment
+def monthly_trends_tab(
+    monthly_summary: pd.DataFrame,
+    monthly_by_dept: pd.DataFrame,
+    selected_fy: int,
+    selected_dept: str,
+) -> None:
+    st.header(f"Monthly Trends - FY{str(selected_fy)[-2:]}")
+    if len(monthly_summary) == 0:
+        st.warning("No monthly data available.")
+    else:
+        callout_list(
+            "Monthly trend explainer",
+            [
+                "Values are aggregated by month after filters",
+                "Quote Gap % uses Expected Quote as the denominator",
+                "Hours Variance % compares actual to quoted hours",
+            ],
+        )
+
+        trend_metric = st.selectbox(
+            "Select Metric",
+            ["actual_margin_pct", "quote_gap_pct", "quoted_amount", "hours_variance_pct", "effective_rate_hr"],
+            format_func=lambda x: {
+                "actual_margin_pct": "Margin %",
+                "quote_gap_pct": "Quote Gap % (Quoting Accuracy)",
+                "quoted_amount": "Revenue (Quoted Amount)",
+                "hours_variance_pct": "Hours Variance %",
+                "effective_rate_hr": "Effective Rate/Hr",
+            }.get(x, x),
+        )
+
+        format_map = {
+            "actual_margin_pct": ".1f",
+            "quote_gap_pct": ".1f",
+            "hours_variance_pct": ".1f",
+            "quoted_amount": "$,.0f",
+            "effective_rate_hr": "$,.0f",
+        }
+        metric_format = format_map.get(trend_metric, ",.1f")
+        month_order = monthly_summary["Calendar_Month"].tolist()
+        trend_chart = (
+            alt.Chart(monthly_summary[["Calendar_Month", trend_metric]])
+            .mark_line(point=alt.OverlayMarkDef(size=65), strokeWidth=3)
+            .encode(
+                x=alt.X("Calendar_Month:N", sort=month_order, axis=alt.Axis(labelAngle=-45)),
+                y=alt.Y(f"{trend_metric}:Q", axis=alt.Axis(format=metric_format)),
+                color=alt.value("#2e86ab"),
+                tooltip=["Calendar_Month", alt.Tooltip(f"{trend_metric}:Q", format=metric_format)],
+            )
+            .properties(height=350)
+        )
+        st.altair_chart(trend_chart, use_container_width=True)
+
+        if selected_dept == "All Departments" and len(monthly_by_dept) > 0:
+            st.subheader("Margin % by Department")
+            dept_trend = (
+                alt.Chart(monthly_by_dept[["Calendar_Month", "department_reporting", "actual_margin_pct"]])
+                .mark_line(point=alt.OverlayMarkDef(size=40))
+                .encode(
+                    x=alt.X(
+                        "Calendar_Month:N",
+                        sort=month_order,
+                        axis=alt.Axis(labelAngle=-45),
+                    ),
+                    y=alt.Y("actual_margin_pct:Q", title="Margin %"),
+                    color="department_reporting:N",
+                    tooltip=[
+                        "Calendar_Month",
+                        "department_reporting",
+                        alt.Tooltip("actual_margin_pct:Q", format=".0f"),
+                    ],
+                )
+                .properties(height=350)
+            )
+            st.altair_chart(dept_trend, use_container_width=True)
+
+
+@st.fragment
+def drilldown_tab(
+    dept_summary: pd.DataFrame,
+    product_summary: pd.DataFrame,
+    job_summary: pd.DataFrame,
+) -> None:
+    st.header("Hierarchical Analysis")
+    callout_list(
+        "Drill-down explainer",
+        [
+            "Each level inherits the filters above",
+            "Use Margin % to spot weak performers",
+            "Use Quote Gap to spot pricing issues",
+        ],
+    )
+
+    if len(dept_summary) > 0:
+        st.subheader("Department Scoreboard")
+        dept_scatter = (
+            alt.Chart(
+                dept_summary[["department_reporting", "quote_gap_pct", "margin_pct", "Margin_Band", "job_count"]]
+            )
+            .mark_circle(size=240)
+            .encode(
+                x=alt.X("quote_gap_pct:Q", title="Quote Gap %"),
+                y=alt.Y("margin_pct:Q", title="Margin %"),
+                color=alt.Color(
+                    "Margin_Band:N",
+                    scale=alt.Scale(domain=["Healthy", "Watch", "At Risk"], range=["#2ecc71", "#f4d35e", "#e4572e"]),
+                ),
+                size=alt.Size("job_count:Q", title="# Jobs", scale=alt.Scale(range=[200, 1200])),
+                tooltip=[
+                    "department_reporting",
+                    alt.Tooltip("job_count:Q", format=",.0f", title="# Jobs"),
+                    alt.Tooltip("margin_pct:Q", format=".1f", title="Margin %"),
+                    alt.Tooltip("quote_gap_pct:Q", format=".1f", title="Quote Gap %"),
+                ],
+            )
+            .properties(height=360)
+        )
+        st.altair_chart(dept_scatter, use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("Level 2: Product Performance")
+    sel_dept_drill = st.selectbox("Filter by Department", ["All"] + category_options(dept_summary["department_reporting"]))
+    prod_f = product_summary if sel_dept_drill == "All" else product_summary[product_summary["department_reporting"] == sel_dept_drill]
+
+    if len(prod_f) > 0:
+        prod_chart = (
+            alt.Chart(prod_f[["product", "department_reporting", "margin_pct"]])
+            .mark_bar(size=16, cornerRadiusEnd=3)
+            .encode(
+                y=alt.Y("product:N", sort="-x"),
+                x=alt.X("margin_pct:Q", title="Margin %", axis=alt.Axis(format="~s")),
+                color=alt.condition(alt.datum.margin_pct < 20, alt.value("#e74c3c"), alt.value("#2ecc71")),
+                tooltip=["product", "department_reporting", alt.Tooltip("margin_pct:Q", format=".1f")],
+            )
+            .properties(height=320)
+        )
+        st.altair_chart(prod_chart, use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("Level 3: Job Performance")
+    sel_prod = st.selectbox("Filter by Product", ["All"] + category_options(prod_f["product"]))
+    jobs_f = job_summary
+    if sel_dept_drill != "All":
+        jobs_f = jobs_f[jobs_f["department_reporting"] == sel_dept_drill]
+    if sel_prod != "All":
+        jobs_f = jobs_f[jobs_f["product"] == sel_prod]
+
+    c1, c2, c3, c4 = st.columns(4)
+    show_loss = c1.checkbox("Loss only")
+    show_underquoted = c2.checkbox("Underquoted")
+    show_overrun = c3.checkbox("Hour Overrun")
+    sort_by = c4.selectbox("Sort", ["margin", "quote_gap", "hours_variance_pct", "margin_pct"])
+
+    want = int(show_loss) | (int(show_underquoted) << 1) | (int(show_overrun) << 2)
+    if want:
+        jobs_f = jobs_f[(jobs_f["flag_bits"].to_numpy() & want) == want]
+
+    jobs_disp = top_rows(jobs_f, sort_by, 25, ascending=sort_by in ["margin", "quote_gap"])
+
+    if len(job_summary) > 0:
+        job_chart_cols = [
+            "job_name",
+            "department_reporting",
+            "product",
+            "margin_pct",
+            "quote_gap_pct",
+            "hours_variance_pct",
+        ]
+        job_chart = (
+            alt.Chart(job_summary[job_chart_cols])
+            .mark_circle(size=110)
+            .encode(
+                x=alt.X("quote_gap_pct:Q", title="Quote Gap %"),
+                y=alt.Y("margin_pct:Q", title="Margin %"),
+                color=alt.condition(alt.datum.margin_pct < 20, alt.value("#e4572e"), alt.value("#2ecc71")),
+                tooltip=[
+                    "job_name",
+                    "department_reporting",
+                    "product",
+                    alt.Tooltip("margin_pct:Q", format=".1f", title="Margin %"),
+                    alt.Tooltip("quote_gap_pct:Q", format=".1f", title="Quote Gap %"),
+                    alt.Tooltip("hours_variance_pct:Q", format=".0f", title="Hours Var %"),
+                ],
+            )
+            .properties(height=360)
+        )
+        st.altair_chart(job_chart, use_container_width=True)
+
+    if len(jobs_disp) > 0:
+        cols = [
+            "job_no",
+            "job_name",
+            "client",
+            "Calendar_Month",
+            "quoted_amount",
+            "expected_quote",
+            "quote_gap",
+            "base_cost",
+            "margin",
+            "margin_pct",
+            "hours_variance_pct",
+        ]
+        st.dataframe(
+            jobs_disp[cols],
+            use_container_width=True,
+            height=400,
+            column_config={
+                "quoted_amount": st.column_config.NumberColumn(format="dollar", step=1),
+                "expected_quote": st.column_config.NumberColumn(format="dollar", step=1),
+                "quote_gap": st.column_config.NumberColumn(format="dollar", step=1),
+                "base_cost": st.column_config.NumberColumn(format="dollar", step=1),
+                "margin": st.column_config.NumberColumn(format="dollar", step=1),
+                "margin_pct": st.column_config.NumberColumn(format="%.1f%%"),
+                "hours_variance_pct": st.column_config.NumberColumn(format="%+.0f%%"),
+            },
+        )
+    else:
+        st.info("No jobs match filters.")
+
+
+@st.fragment
+def job_diagnosis_tab(job_summary: pd.DataFrame, task_summary: pd.DataFrame) -> None:
+    st.header("Job Diagnosis Tool")
+    st.markdown("*Understand why a specific job performed the way it did*")
+    all_jobs = (
+        job_summary["job_no"].astype(str)
+        + " - "
+        + job_summary["job_name"].astype(str).str.slice(0, 40)
+        + " ("
+        + job_summary["client"].astype(str)
+        + ")"
+    ).tolist()
+
+    selected_job = st.selectbox("Select a Job to Diagnose", ["-- Select --"] + all_jobs)
+
+    if selected_job != "-- Select --":
+        job_no = selected_job.split(" - ")[0]
+        job_row = job_summary[job_summary["job_no"] == job_no].iloc[0]
+        job_tasks = task_summary[task_summary["job_no"] == job_no]
+
+        diagnosis = diagnose_job_margin(job_row, job_tasks)
+
+        st.subheader(f"{job_row['job_name']}")
+        st.caption(f"Client: {job_row['client']} | {job_row['Calendar_Month']}")
+
+        c1, c2, c3, c4, c5 = st.columns(5)
+        c1.metric("Revenue", fmt_currency(job_row["quoted_amount"]))
+        c2.metric("Cost", fmt_currency(job_row["base_cost"]))
+        c3.metric("Margin", fmt_currency(job_row["margin"]))
+        c4.metric("Quote Gap", fmt_currency(job_row["quote_gap"]))
+        c5.metric("Hours Var", f"{job_row['hours_variance_pct']:+.0f}%")
+
+        st.markdown("---")
+        st.subheader("Diagnosis")
+        st.markdown(f"**Summary:** {diagnosis['summary']}")
+
+        if diagnosis["issues"]:
+            st.markdown("**Issues Identified:**")
+            for issue in diagnosis["issues"]:
+                st.markdown(f"- {issue}")
+
+        if diagnosis["root_causes"]:
+            st.markdown("**Root Causes:**")
+            for cause in diagnosis["root_causes"]:
+                st.markdown(f"- {cause}")
+
+        if diagnosis["recommendations"]:
+            st.markdown("**Recommendations:**")
+            for rec in diagnosis["recommendations"]:
+                st.markdown(f"- {rec}")
+
+        if len(job_tasks) > 0:
+            st.markdown("---")
+            st.subheader("Task Analysis")
+            unquoted_tasks = job_tasks[job_tasks["is_unquoted"]]
+            overrun_tasks = job_tasks[job_tasks["is_overrun"] & ~job_tasks["is_unquoted"]]
+            underquoted_tasks = job_tasks[job_tasks["quote_gap"] < 0]
+
+            if len(unquoted_tasks) > 0:
+                st.markdown("**Unquoted Tasks (Scope Creep):**")
+                lines = (
+                    "- "
+                    + unquoted_tasks["task_name"].astype(str)
+                    + ": "
+                    + unquoted_tasks["actual_hours"].map("{:.0f}".format)
+                    + " hrs, $"
+                    + unquoted_tasks["base_cost"].map("{:,.0f}".format)
+                    + " cost"
+                )
+                st.markdown("\n".join(lines))
+
+            if len(overrun_tasks) > 0:
+                st.markdown("**Hour Overruns:**")
+                lines = (
+                    "- "
+                    + overrun_tasks["task_name"].astype(str)
+                    + ": "
+                    + overrun_tasks["hours_variance"].map("{:+.0f}".format)
+                    + " hrs over"
+                )
+                st.markdown("\n".join(lines))
+
+            if len(underquoted_tasks) > 0:
+                st.markdown("**Underquoted Tasks:**")
+                lines = (
+                    "- "
+                    + underquoted_tasks["task_name"].astype(str)
+                    + ": $"
+                    + underquoted_tasks["quote_gap"].abs().map("{:,.0f}".format)
+                    + " below internal rates"
+                )
+                st.markdown("\n".join(lines))
+
+
+@st.fragment
+def quote_builder_tab(
+    fact: pd.DataFrame,
+    data_key: str,
+    df_filtered: pd.DataFrame,
+    timesheet_task_month: pd.DataFrame,
+    fy_list: list[int],
+    dept_list: list[str],
+    selected_fy: int,
+    dept_filter: str | None,
+    exclude_sg: bool,
+    billable_only: bool,
+) -> None:
+    st.header("Smart Quote Builder")
+    callout_list(
+        "How this works",
+        [
+            "Select a department and product to anchor historical tasks",
+            "Pick tasks, adjust proposed hours, and add custom lines",
+            "Quote uses standard billable rates for pricing",
+        ],
+    )
+
+    c1, c2, c3 = st.columns(3)
+    builder_dept = c1.selectbox("Department", ["All Departments"] + dept_list, key="b_dept")
+    builder_dept_filter = None if builder_dept == "All Departments" else builder_dept
+    builder_fy = c2.selectbox(
+        "Reference Fiscal Year",
+        fy_list,
+        index=len(fy_list) - 1,
+        key="b_fy",
+        format_func=lambda x: f"FY{str(x)[-2:]}",
+    )
+
+    if builder_fy == selected_fy and builder_dept_filter == dept_filter:
+        base_filtered = df_filtered
+    else:
+        base_filtered, _ = filter_fact(
+            fact,
+            data_key,
+            exclude_sg_allocation=exclude_sg,
+            billable_only=billable_only,
+            fiscal_year=builder_fy,
+            department=builder_dept_filter,
+        )
+
+    products = get_available_products(base_filtered, builder_dept_filter)
+    builder_product = c3.selectbox("Product", products if products else ["None"], key="b_prod")
+
+    if builder_product == "None" or len(base_filtered) == 0:
+        st.info("No data available for the selected context.")
+    else:
+        task_stats = builder_task_stats(
+            base_filtered[["job_no", "task_name", "department_reporting", "product"]],
+            timesheet_task_month,
+            data_key,
+            builder_dept_filter,
+            builder_product,
+        )
+
+        if len(task_stats) == 0:
+            st.warning("No tasks found for this product and fiscal year.")
+        else:
+            st.subheader("Historical Task Library")
+            st.dataframe(
+                task_stats[[
+                    "task_name",
+                    "Frequency_Pct",
+                    "Avg_Quoted_Hours",
+                    "Avg_Actual_Hours",
+                    "Billable_Rate_Hr",
+                    "Cost_Rate_Hr",
+                ]],
+                use_container_width=True,
+                height=320,
+                column_config={
+                    "Frequency_Pct": st.column_config.NumberColumn(format="%.0f%%"),
+                    "Avg_Quoted_Hours": st.column_config.NumberColumn(format="%.1f"),
+                    "Avg_Actual_Hours": st.column_config.NumberColumn(format="%.1f"),
+                    "Billable_Rate_Hr": st.column_config.NumberColumn(format="dollar", step=1),
+                    "Cost_Rate_Hr": st.column_config.NumberColumn(format="dollar", step=1),
+                },
+            )
+
+            default_tasks = task_stats[task_stats["Frequency_Pct"] >= 75]["task_name"].tolist()
+            selected_tasks = st.multiselect(
+                "Select tasks to include",
+                task_stats["task_name"].tolist(),
+                default=default_tasks,
+            )
+
+            if selected_tasks:
+                builder_df = task_stats[task_stats["task_name"].isin(selected_tasks)].copy()
+                builder_df["Proposed_Hours"] = builder_df["Avg_Actual_Hours"].round(1)
+                builder_df = builder_df[[
+                    "task_name",
+                    "Frequency_Pct",
+                    "Avg_Quoted_Hours",
+                    "Avg_Actual_Hours",
+                    "Proposed_Hours",
+                    "Billable_Rate_Hr",
+                    "Cost_Rate_Hr",
+                    "Total_Actual_Hours",
+                ]]
+
+                st.subheader("Quote Builder")
+                edited = st.data_editor(
+                    builder_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "task_name": st.column_config.TextColumn("Task"),
+                        "Frequency_Pct": st.column_config.NumberColumn("Frequency %", format="%.0f"),
+                        "Avg_Quoted_Hours": st.column_config.NumberColumn("Avg Quoted Hrs", format="%.1f"),
+                        "Avg_Actual_Hours": st.column_config.NumberColumn("Avg Actual Hrs", format="%.1f"),
+                        "Proposed_Hours": st.column_config.NumberColumn("Proposed Hrs", min_value=0.0, step=0.5),
+                        "Billable_Rate_Hr": st.column_config.NumberColumn("Billable Rate/Hr", format="$%.0f"),
+                        "Cost_Rate_Hr": st.column_config.NumberColumn("Cost Rate/Hr", format="$%.0f"),
+                    },
+                    disabled=[
+                        "task_name",
+                        "Frequency_Pct",
+                        "Avg_Quoted_Hours",
+                        "Avg_Actual_Hours",
+                        "Billable_Rate_Hr",
+                        "Cost_Rate_Hr",
+                        "Total_Actual_Hours",
+                    ],
+                )
+
+                if "custom_items" not in st.session_state:
+                    st.session_state["custom_items"] = pd.DataFrame(
+                        columns=["Task_Name", "Proposed_Hours", "Billable_Rate_Hr", "Cost_Rate_Hr"]
+                    )
+
+                custom_items = st.data_editor(
+                    st.session_state["custom_items"],
+                    use_container_width=True,
+                    num_rows="dynamic",
+                    hide_index=True,
+                    column_config={
+                        "Task_Name": st.column_config.TextColumn("Task"),
+                        "Proposed_Hours": st.column_config.NumberColumn("Proposed Hrs", min_value=0.0, step=0.5),
+                        "Billable_Rate_Hr": st.column_config.NumberColumn("Billable Rate/Hr", min_value=0.0, format="$%.0f"),
+                        "Cost_Rate_Hr": st.column_config.NumberColumn("Cost Rate/Hr", min_value=0.0, format="$%.0f"),
+                    },
+                )
+                st.session_state["custom_items"] = custom_items
+
+                custom_clean = custom_items.copy()
+                for col in ["Proposed_Hours", "Billable_Rate_Hr", "Cost_Rate_Hr"]:
+                    if custom_clean[col].dtype.kind not in "fi":
+                        custom_clean[col] = pd.to_numeric(custom_clean[col], errors="coerce")
+                custom_clean["Task_Name"] = custom_clean["Task_Name"].fillna("").astype(str).str.strip()
+                valid_custom = custom_clean.dropna(
+                    subset=["Proposed_Hours", "Billable_Rate_Hr", "Cost_Rate_Hr"]
+                )
+                valid_custom = valid_custom[
+                    (valid_custom["Proposed_Hours"] > 0) & (valid_custom["Task_Name"] != "")
+                ]
+
+                proposed = edited["Proposed_Hours"].to_numpy(dtype=float)
+                custom_proposed = valid_custom["Proposed_Hours"].to_numpy(dtype=float)
+
+                custom_revenue = custom_proposed @ valid_custom["Billable_Rate_Hr"].to_numpy(dtype=float)
+                custom_cost = custom_proposed @ valid_custom["Cost_Rate_Hr"].to_numpy(dtype=float)
+
+                total_revenue = np.nansum(proposed * edited["Billable_Rate_Hr"].to_numpy(dtype=float)) + custom_revenue
+                total_cost = np.nansum(proposed * edited["Cost_Rate_Hr"].to_numpy(dtype=float)) + custom_cost
+                margin = total_revenue - total_cost
+                margin_pct = (margin / total_revenue * 100) if total_revenue > 0 else 0
+
+                total_proposed_hours = edited["Proposed_Hours"].sum() + valid_custom["Proposed_Hours"].sum()
+                total_hist_actual = edited["Total_Actual_Hours"].sum()
+
+                st.subheader("Final Recommendation")
+                col_a, col_b, col_c = st.columns(3)
+                col_a.metric("Total Recommended Quote", fmt_currency(total_revenue))
+                col_b.metric("Projected Margin %", fmt_pct(margin_pct))
+                col_c.metric("Total Proposed Hours", f"{total_proposed_hours:,.1f}")
+
+                if total_hist_actual > 0 and total_proposed_hours < total_hist_actual * 0.8:
+                    st.warning(
+                        "Proposed hours are >20% below historical actual hours for these tasks. "
+                        "Consider increasing scope or validating assumptions."
+                    )
+
+
 def main() -> None:
     apply_chart_theme()
     hero(
@@ -295,7 +851,8 @@ def main() -> None:
         include_all_history=base["include_all_history"],
     )
 
-    fact = prepare_fact_for_analysis(data["fact"])
+    data_key = data["fact"].attrs[DATA_KEY_ATTR]
+    fact = prepare_fact(data["fact"], data_key)
 
     fy_list = get_available_fiscal_years(fact)
     if not fy_list:
@@ -317,8 +874,9 @@ def main() -> None:
     exclude_sg = st.sidebar.checkbox("Exclude SG Allocation", value=False)
     billable_only = st.sidebar.checkbox("Billable tasks only", value=False)
 
-    df_filtered, recon = apply_filters(
+    df_filtered, recon = filter_fact(
         fact,
+        data_key,
         exclude_sg_allocation=exclude_sg,
         billable_only=billable_only,
         fiscal_year=selected_fy,
@@ -368,16 +926,19 @@ def main() -> None:
 
         st.markdown("---")
 
+        quoted_amount_fmt = fmt_currency(metrics["total_quoted_amount"])
+        margin_pct_fmt = fmt_pct(metrics["margin_pct"])
+
         st.subheader("Revenue & Margin")
         c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Revenue (Quoted)", fmt_currency(metrics["total_quoted_amount"]))
+        c1.metric("Revenue (Quoted)", quoted_amount_fmt)
         c2.metric("Base Cost", fmt_currency(metrics["total_base_cost"]))
-        c3.metric("Margin", fmt_currency(metrics["margin"]), delta=fmt_pct(metrics["margin_pct"]))
-        c4.metric("Margin %", fmt_pct(metrics["margin_pct"]))
+        c3.metric("Margin", fmt_currency(metrics["margin"]), delta=margin_pct_fmt)
+        c4.metric("Margin %", margin_pct_fmt)
 
         st.subheader("Quoting Sanity Check")
         c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Quoted Amount", fmt_currency(metrics["total_quoted_amount"]))
+        c1.metric("Quoted Amount", quoted_amount_fmt)
         c2.metric("Expected Quote", fmt_currency(metrics["total_expected_quote"]))
         gap = metrics["quote_gap"]
         gap_label = "Above" if gap >= 0 else "Below"
@@ -399,11 +960,11 @@ def main() -> None:
         c4.metric("Scope Creep Tasks", str(causes["scope_creep"]["count"]))
 
         st.subheader("Margin Bridge")
-        bridge_data = pd.DataFrame(
-            [
-                {"Step": "1. Revenue (Quoted)", "Amount": metrics["total_quoted_amount"], "Color": "Revenue"},
-                {"Step": "2. Base Cost", "Amount": -metrics["total_base_cost"], "Color": "Cost"},
-                {"Step": "3. Margin", "Amount": metrics["margin"], "Color": "Margin"},
+        bridge_data = alt.Data(
+            values=[
+                {"Step": "1. Revenue (Quoted)", "Amount": float(metrics["total_quoted_amount"]), "Color": "Revenue"},
+                {"Step": "2. Base Cost", "Amount": -float(metrics["total_base_cost"]), "Color": "Cost"},
+                {"Step": "3. Margin", "Amount": float(metrics["margin"]), "Color": "Margin"},
             ]
         )
         bridge_chart = (
@@ -416,456 +977,35 @@ def main() -> None:
                     "Color:N",
                     scale=alt.Scale(domain=["Revenue", "Cost", "Margin"], range=["#2e86ab", "#e4572e", "#2ecc71"]),
                 ),
-                tooltip=["Step", alt.Tooltip("Amount:Q", format="$,.0f")],
+                tooltip=["Step:N", alt.Tooltip("Amount:Q", format="$,.0f")],
             )
             .properties(height=300)
         )
         st.altair_chart(bridge_chart, use_container_width=True)
 
     with tab2:
-        st.header(f"Monthly Trends - FY{str(selected_fy)[-2:]}")
-        if len(monthly_summary) == 0:
-            st.warning("No monthly data available.")
-        else:
-            callout_list(
-                "Monthly trend explainer",
-                [
-                    "Values are aggregated by month after filters",
-                    "Quote Gap % uses Expected Quote as the denominator",
-                    "Hours Variance % compares actual to quoted hours",
-                ],
-            )
-
-            trend_metric = st.selectbox(
-                "Select Metric",
-                ["actual_margin_pct", "quote_gap_pct", "quoted_amount", "hours_variance_pct", "effective_rate_hr"],
-                format_func=lambda x: {
-                    "actual_margin_pct": "Margin %",
-                    "quote_gap_pct": "Quote Gap % (Quoting Accuracy)",
-                    "quoted_amount": "Revenue (Quoted Amount)",
-                    "hours_variance_pct": "Hours Variance %",
-                    "effective_rate_hr": "Effective Rate/Hr",
-                }.get(x, x),
-            )
-
-            format_map = {
-                "actual_margin_pct": ".1f",
-                "quote_gap_pct": ".1f",
-                "hours_variance_pct": ".1f",
-                "quoted_amount": "$,.0f",
-                "effective_rate_hr": "$,.0f",
-            }
-            metric_format = format_map.get(trend_metric, ",.1f")
-            trend_chart = (
-                alt.Chart(monthly_summary)
-                .mark_line(point=alt.OverlayMarkDef(size=65), strokeWidth=3)
-                .encode(
-                    x=alt.X("Calendar_Month:N", sort=list(monthly_summary["Calendar_Month"]), axis=alt.Axis(labelAngle=-45)),
-                    y=alt.Y(f"{trend_metric}:Q", axis=alt.Axis(format=metric_format)),
-                    color=alt.value("#2e86ab"),
-                    tooltip=["Calendar_Month", alt.Tooltip(f"{trend_metric}:Q", format=metric_format)],
-                )
-                .properties(height=350)
-            )
-            st.altair_chart(trend_chart, use_container_width=True)
-
-            if selected_dept == "All Departments" and len(monthly_by_dept) > 0:
-                st.subheader("Margin % by Department")
-                dept_trend = (
-                    alt.Chart(monthly_by_dept)
-                    .mark_line(point=alt.OverlayMarkDef(size=40))
-                    .encode(
-                        x=alt.X(
-                            "Calendar_Month:N",
-                            sort=list(monthly_summary["Calendar_Month"]),
-                            axis=alt.Axis(labelAngle=-45),
-                        ),
-                        y=alt.Y("actual_margin_pct:Q", title="Margin %"),
-                        color="department_reporting:N",
-                        tooltip=[
-                            "Calendar_Month",
-                            "department_reporting",
-                            alt.Tooltip("actual_margin_pct:Q", format=".0f"),
-                        ],
-                    )
-                    .properties(height=350)
-                )
-                st.altair_chart(dept_trend, use_container_width=True)
+        monthly_trends_tab(monthly_summary, monthly_by_dept, selected_fy, selected_dept)
 
     with tab3:
-        st.header("Hierarchical Analysis")
-        callout_list(
-            "Drill-down explainer",
-            [
-                "Each level inherits the filters above",
-                "Use Margin % to spot weak performers",
-                "Use Quote Gap to spot pricing issues",
-            ],
-        )
-
-        if len(dept_summary) > 0:
-            st.subheader("Department Scoreboard")
-            dept_metrics = dept_summary.copy()
-            dept_metrics["Margin_Band"] = np.where(
-                dept_metrics["margin_pct"] >= 35,
-                "Healthy",
-                np.where(dept_metrics["margin_pct"] < 20, "At Risk", "Watch"),
-            )
-            dept_scatter = (
-                alt.Chart(dept_metrics)
-                .mark_circle(size=240)
-                .encode(
-                    x=alt.X("quote_gap_pct:Q", title="Quote Gap %"),
-                    y=alt.Y("margin_pct:Q", title="Margin %"),
-                    color=alt.Color(
-                        "Margin_Band:N",
-                        scale=alt.Scale(domain=["Healthy", "Watch", "At Risk"], range=["#2ecc71", "#f4d35e", "#e4572e"]),
-                    ),
-                    size=alt.Size("job_count:Q", title="# Jobs", scale=alt.Scale(range=[200, 1200])),
-                    tooltip=[
-                        "department_reporting",
-                        alt.Tooltip("job_count:Q", format=",.0f", title="# Jobs"),
-                        alt.Tooltip("margin_pct:Q", format=".1f", title="Margin %"),
-                        alt.Tooltip("quote_gap_pct:Q", format=".1f", title="Quote Gap %"),
-                    ],
-                )
-                .properties(height=360)
-            )
-            st.altair_chart(dept_scatter, use_container_width=True)
-
-        st.markdown("---")
-        st.subheader("Level 2: Product Performance")
-        sel_dept_drill = st.selectbox("Filter by Department", ["All"] + sorted(dept_summary["department_reporting"].unique().tolist()))
-        prod_f = product_summary if sel_dept_drill == "All" else product_summary[product_summary["department_reporting"] == sel_dept_drill]
-
-        if len(prod_f) > 0:
-            prod_chart = (
-                alt.Chart(prod_f)
-                .mark_bar(size=16, cornerRadiusEnd=3)
-                .encode(
-                    y=alt.Y("product:N", sort="-x"),
-                    x=alt.X("margin_pct:Q", title="Margin %", axis=alt.Axis(format="~s")),
-                    color=alt.condition(alt.datum.margin_pct < 20, alt.value("#e74c3c"), alt.value("#2ecc71")),
-                    tooltip=["product", "department_reporting", alt.Tooltip("margin_pct:Q", format=".1f")],
-                )
-                .properties(height=320)
-            )
-            st.altair_chart(prod_chart, use_container_width=True)
-
-        st.markdown("---")
-        st.subheader("Level 3: Job Performance")
-        sel_prod = st.selectbox("Filter by Product", ["All"] + sorted(prod_f["product"].unique().tolist()))
-        jobs_f = job_summary.copy()
-        if sel_dept_drill != "All":
-            jobs_f = jobs_f[jobs_f["department_reporting"] == sel_dept_drill]
-        if sel_prod != "All":
-            jobs_f = jobs_f[jobs_f["product"] == sel_prod]
-
-        c1, c2, c3, c4 = st.columns(4)
-        show_loss = c1.checkbox("Loss only")
-        show_underquoted = c2.checkbox("Underquoted")
-        show_overrun = c3.checkbox("Hour Overrun")
-        sort_by = c4.selectbox("Sort", ["margin", "quote_gap", "hours_variance_pct", "margin_pct"])
-
-        if show_loss:
-            jobs_f = jobs_f[jobs_f["is_loss"]]
-        if show_underquoted:
-            jobs_f = jobs_f[jobs_f["is_underquoted"]]
-        if show_overrun:
-            jobs_f = jobs_f[jobs_f["is_overrun"]]
-
-        jobs_disp = jobs_f.sort_values(sort_by, ascending=sort_by in ["margin", "quote_gap"]).head(25)
-
-        if len(job_summary) > 0:
-            job_chart = (
-                alt.Chart(job_summary)
-                .mark_circle(size=110)
-                .encode(
-                    x=alt.X("quote_gap_pct:Q", title="Quote Gap %"),
-                    y=alt.Y("margin_pct:Q", title="Margin %"),
-                    color=alt.condition(alt.datum.margin_pct < 20, alt.value("#e4572e"), alt.value("#2ecc71")),
-                    tooltip=[
-                        "job_name",
-                        "department_reporting",
-                        "product",
-                        alt.Tooltip("margin_pct:Q", format=".1f", title="Margin %"),
-                        alt.Tooltip("quote_gap_pct:Q", format=".1f", title="Quote Gap %"),
-                        alt.Tooltip("hours_variance_pct:Q", format=".0f", title="Hours Var %"),
-                    ],
-                )
-                .properties(height=360)
-            )
-            st.altair_chart(job_chart, use_container_width=True)
-
-        if len(jobs_disp) > 0:
-            cols = [
-                "job_no",
-                "job_name",
-                "client",
-                "Calendar_Month",
-                "quoted_amount",
-                "expected_quote",
-                "quote_gap",
-                "base_cost",
-                "margin",
-                "margin_pct",
-                "hours_variance_pct",
-            ]
-            st.dataframe(
-                jobs_disp[cols].style.format(
-                    {
-                        "quoted_amount": "${:,.0f}",
-                        "expected_quote": "${:,.0f}",
-                        "quote_gap": "${:,.0f}",
-                        "base_cost": "${:,.0f}",
-                        "margin": "${:,.0f}",
-                        "margin_pct": "{:.1f}%",
-                        "hours_variance_pct": "{:+.0f}%",
-                    }
-                ),
-                use_container_width=True,
-                height=400,
-            )
-        else:
-            st.info("No jobs match filters.")
+        drilldown_tab(dept_summary, product_summary, job_summary)
 
     with tab4:
-        st.header("Job Diagnosis Tool")
-        st.markdown("*Understand why a specific job performed the way it did*")
-        all_jobs = job_summary.apply(
-            lambda r: f"{r['job_no']} - {str(r['job_name'])[:40]} ({r['client']})", axis=1
-        ).tolist()
-
-        selected_job = st.selectbox("Select a Job to Diagnose", ["-- Select --"] + all_jobs)
-
-        if selected_job != "-- Select --":
-            job_no = selected_job.split(" - ")[0]
-            job_row = job_summary[job_summary["job_no"] == job_no].iloc[0]
-            job_tasks = task_summary[task_summary["job_no"] == job_no]
-
-            diagnosis = diagnose_job_margin(job_row, job_tasks)
-
-            st.subheader(f"{job_row['job_name']}")
-            st.caption(f"Client: {job_row['client']} | {job_row['Calendar_Month']}")
-
-            c1, c2, c3, c4, c5 = st.columns(5)
-            c1.metric("Revenue", fmt_currency(job_row["quoted_amount"]))
-            c2.metric("Cost", fmt_currency(job_row["base_cost"]))
-            c3.metric("Margin", fmt_currency(job_row["margin"]))
-            c4.metric("Quote Gap", fmt_currency(job_row["quote_gap"]))
-            c5.metric("Hours Var", f"{job_row['hours_variance_pct']:+.0f}%")
-
-            st.markdown("---")
-            st.subheader("Diagnosis")
-            st.markdown(f"**Summary:** {diagnosis['summary']}")
-
-            if diagnosis["issues"]:
-                st.markdown("**Issues Identified:**")
-                for issue in diagnosis["issues"]:
-                    st.markdown(f"- {issue}")
-
-            if diagnosis["root_causes"]:
-                st.markdown("**Root Causes:**")
-                for cause in diagnosis["root_causes"]:
-                    st.markdown(f"- {cause}")
-
-            if diagnosis["recommendations"]:
-                st.markdown("**Recommendations:**")
-                for rec in diagnosis["recommendations"]:
-                    st.markdown(f"- {rec}")
-
-            if len(job_tasks) > 0:
-                st.markdown("---")
-                st.subheader("Task Analysis")
-                unquoted_tasks = job_tasks[job_tasks["is_unquoted"]]
-                overrun_tasks = job_tasks[job_tasks["is_overrun"] & ~job_tasks["is_unquoted"]]
-                underquoted_tasks = job_tasks[job_tasks["quote_gap"] < 0]
-
-                if len(unquoted_tasks) > 0:
-                    st.markdown("**Unquoted Tasks (Scope Creep):**")
-                    for _, t in unquoted_tasks.iterrows():
-                        st.markdown(f"- {t['task_name']}: {t['actual_hours']:.0f} hrs, ${t['base_cost']:,.0f} cost")
-
-                if len(overrun_tasks) > 0:
-                    st.markdown("**Hour Overruns:**")
-                    for _, t in overrun_tasks.iterrows():
-                        st.markdown(f"- {t['task_name']}: {t['hours_variance']:+.0f} hrs over")
-
-                if len(underquoted_tasks) > 0:
-                    st.markdown("**Underquoted Tasks:**")
-                    for _, t in underquoted_tasks.iterrows():
-                        st.markdown(f"- {t['task_name']}: ${abs(t['quote_gap']):,.0f} below internal rates")
+        job_diagnosis_tab(job_summary, task_summary)
 
     with tab5:
-        st.header("Smart Quote Builder")
-        callout_list(
-            "How this works",
-            [
-                "Select a department and product to anchor historical tasks",
-                "Pick tasks, adjust proposed hours, and add custom lines",
-                "Quote uses standard billable rates for pricing",
-            ],
-        )
-
-        c1, c2, c3 = st.columns(3)
-        builder_dept = c1.selectbox("Department", ["All Departments"] + dept_list, key="b_dept")
-        builder_dept_filter = None if builder_dept == "All Departments" else builder_dept
-        builder_fy = c2.selectbox(
-            "Reference Fiscal Year",
-            fy_list,
-            index=len(fy_list) - 1,
-            key="b_fy",
-            format_func=lambda x: f"FY{str(x)[-2:]}",
-        )
-
-        base_filtered, _ = apply_filters(
+        quote_builder_tab(
             fact,
-            exclude_sg_allocation=exclude_sg,
-            billable_only=billable_only,
-            fiscal_year=builder_fy,
-            department=builder_dept_filter,
+            data_key,
+            df_filtered,
+            data["timesheet_task_month"],
+            fy_list,
+            dept_list,
+            selected_fy,
+            dept_filter,
+            exclude_sg,
+            billable_only,
         )
 
-        products = get_available_products(base_filtered, builder_dept_filter)
-        builder_product = c3.selectbox("Product", products if products else ["None"], key="b_prod")
-
-        if builder_product == "None" or len(base_filtered) == 0:
-            st.info("No data available for the selected context.")
-        else:
-            task_stats = compute_builder_task_stats(
-                fact=base_filtered,
-                timesheet_task_month=data["timesheet_task_month"],
-                department=builder_dept_filter,
-                product=builder_product,
-            )
-
-            if len(task_stats) == 0:
-                st.warning("No tasks found for this product and fiscal year.")
-            else:
-                st.subheader("Historical Task Library")
-                st.dataframe(
-                    task_stats[[
-                        "task_name",
-                        "Frequency_Pct",
-                        "Avg_Quoted_Hours",
-                        "Avg_Actual_Hours",
-                        "Billable_Rate_Hr",
-                        "Cost_Rate_Hr",
-                    ]].style.format(
-                        {
-                            "Frequency_Pct": "{:.0f}%",
-                            "Avg_Quoted_Hours": "{:,.1f}",
-                            "Avg_Actual_Hours": "{:,.1f}",
-                            "Billable_Rate_Hr": "${:,.0f}",
-                            "Cost_Rate_Hr": "${:,.0f}",
-                        }
-                    ),
-                    use_container_width=True,
-                    height=320,
-                )
-
-                default_tasks = task_stats[task_stats["Frequency_Pct"] >= 75]["task_name"].tolist()
-                selected_tasks = st.multiselect(
-                    "Select tasks to include",
-                    task_stats["task_name"].tolist(),
-                    default=default_tasks,
-                )
-
-                if selected_tasks:
-                    builder_df = task_stats[task_stats["task_name"].isin(selected_tasks)].copy()
-                    builder_df["Proposed_Hours"] = builder_df["Avg_Actual_Hours"].round(1)
-                    builder_df = builder_df[[
-                        "task_name",
-                        "Frequency_Pct",
-                        "Avg_Quoted_Hours",
-                        "Avg_Actual_Hours",
-                        "Proposed_Hours",
-                        "Billable_Rate_Hr",
-                        "Cost_Rate_Hr",
-                        "Total_Actual_Hours",
-                    ]]
-
-                    st.subheader("Quote Builder")
-                    edited = st.data_editor(
-                        builder_df,
-                        use_container_width=True,
-                        hide_index=True,
-                        column_config={
-                            "task_name": st.column_config.TextColumn("Task"),
-                            "Frequency_Pct": st.column_config.NumberColumn("Frequency %", format="%.0f"),
-                            "Avg_Quoted_Hours": st.column_config.NumberColumn("Avg Quoted Hrs", format="%.1f"),
-                            "Avg_Actual_Hours": st.column_config.NumberColumn("Avg Actual Hrs", format="%.1f"),
-                            "Proposed_Hours": st.column_config.NumberColumn("Proposed Hrs", min_value=0.0, step=0.5),
-                            "Billable_Rate_Hr": st.column_config.NumberColumn("Billable Rate/Hr", format="$%.0f"),
-                            "Cost_Rate_Hr": st.column_config.NumberColumn("Cost Rate/Hr", format="$%.0f"),
-                        },
-                        disabled=[
-                            "task_name",
-                            "Frequency_Pct",
-                            "Avg_Quoted_Hours",
-                            "Avg_Actual_Hours",
-                            "Billable_Rate_Hr",
-                            "Cost_Rate_Hr",
-                            "Total_Actual_Hours",
-                        ],
-                    )
-
-                    if "custom_items" not in st.session_state:
-                        st.session_state["custom_items"] = pd.DataFrame(
-                            columns=["Task_Name", "Proposed_Hours", "Billable_Rate_Hr", "Cost_Rate_Hr"]
-                        )
-
-                    custom_items = st.data_editor(
-                        st.session_state["custom_items"],
-                        use_container_width=True,
-                        num_rows="dynamic",
-                        hide_index=True,
-                        column_config={
-                            "Task_Name": st.column_config.TextColumn("Task"),
-                            "Proposed_Hours": st.column_config.NumberColumn("Proposed Hrs", min_value=0.0, step=0.5),
-                            "Billable_Rate_Hr": st.column_config.NumberColumn("Billable Rate/Hr", min_value=0.0, format="$%.0f"),
-                            "Cost_Rate_Hr": st.column_config.NumberColumn("Cost Rate/Hr", min_value=0.0, format="$%.0f"),
-                        },
-                    )
-                    st.session_state["custom_items"] = custom_items
-
-                    custom_clean = custom_items.copy()
-                    for col in ["Proposed_Hours", "Billable_Rate_Hr", "Cost_Rate_Hr"]:
-                        custom_clean[col] = pd.to_numeric(custom_clean[col], errors="coerce")
-                    custom_clean["Task_Name"] = custom_clean["Task_Name"].fillna("").astype(str).str.strip()
-                    valid_custom = custom_clean.dropna(
-                        subset=["Proposed_Hours", "Billable_Rate_Hr", "Cost_Rate_Hr"]
-                    )
-                    valid_custom = valid_custom[
-                        (valid_custom["Proposed_Hours"] > 0) & (valid_custom["Task_Name"] != "")
-                    ]
-
-                    edited["Revenue"] = edited["Proposed_Hours"] * edited["Billable_Rate_Hr"]
-                    edited["Cost"] = edited["Proposed_Hours"] * edited["Cost_Rate_Hr"]
-
-                    custom_revenue = (valid_custom["Proposed_Hours"] * valid_custom["Billable_Rate_Hr"]).sum()
-                    custom_cost = (valid_custom["Proposed_Hours"] * valid_custom["Cost_Rate_Hr"]).sum()
-
-                    total_revenue = edited["Revenue"].sum() + custom_revenue
-                    total_cost = edited["Cost"].sum() + custom_cost
-                    margin = total_revenue - total_cost
-                    margin_pct = (margin / total_revenue * 100) if total_revenue > 0 else 0
-
-                    total_proposed_hours = edited["Proposed_Hours"].sum() + valid_custom["Proposed_Hours"].sum()
-                    total_hist_actual = edited["Total_Actual_Hours"].sum()
-
-                    st.subheader("Final Recommendation")
-                    col_a, col_b, col_c = st.columns(3)
-                    col_a.metric("Total Recommended Quote", fmt_currency(total_revenue))
-                    col_b.metric("Projected Margin %", fmt_pct(margin_pct))
-                    col_c.metric("Total Proposed Hours", f"{total_proposed_hours:,.1f}")
-
-                    if total_hist_actual > 0 and total_proposed_hours < total_hist_actual * 0.8:
-                        st.warning(
-                            "Proposed hours are >20% below historical actual hours for these tasks. "
-                            "Consider increasing scope or validating assumptions."
-                        )
-
     st.markdown("---")
     st.caption(
         f"Job Profitability Analysis | FY{str(selected_fy)[-2:]} | {selected_dept} | "
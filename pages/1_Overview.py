@@ -2,9 +2,21 @@ from __future__ import annotations
 
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 
-from src.app_state import apply_filters, get_data, sidebar_base_controls, sidebar_filters
+from src.app_state import compute_overview_metrics, get_data, month_values, sidebar_base_controls, sidebar_filters
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def monthly_figure(monthly: pd.DataFrame) -> go.Figure:
+    return px.line(
+        monthly,
+        x="month_key",
+        y=["revenue", "cost"],
+        markers=True,
+        title="Revenue vs Cost by Month",
+    )
 
 
 st.header("Overview")
@@ -19,18 +31,16 @@ data = get_data(
 )
 
 filters = sidebar_filters(data["fact"], base)
-filtered_fact = apply_filters(data["fact"], filters)
+overview = compute_overview_metrics(data["fact"], filters, data.get("job_month_summary"))
 
-revenue = filtered_fact["revenue_allocated"].sum()
-cost = filtered_fact["total_cost"].sum()
+revenue = overview["revenue"]
+cost = overview["cost"]
 profit = revenue - cost
 margin = profit / revenue if revenue else 0
 
-jobs = filtered_fact["job_no"].nunique()
-tasks = filtered_fact["task_name"].nunique()
-unallocated = filtered_fact.loc[
-    filtered_fact["is_unallocated_row"], "revenue_allocated"
-].sum()
+jobs = overview["jobs"]
+tasks = overview["tasks"]
+unallocated = overview["unallocated"]
 
 col1, col2, col3, col4, col5, col6 = st.columns(6)
 col1.metric("Total Revenue", f"{revenue:,.0f}")
@@ -40,29 +50,13 @@ col4.metric("Margin", f"{margin:.1%}")
 col5.metric("Jobs", f"{jobs}")
 col6.metric("Unallocated Revenue", f"{unallocated:,.0f}")
 
-monthly = (
-    filtered_fact.groupby("month_key", dropna=False)
-    .agg(revenue=("revenue_allocated", "sum"), cost=("total_cost", "sum"))
-    .reset_index()
-)
-monthly["month_key"] = pd.to_datetime(monthly["month_key"], errors="coerce")
+monthly = overview["monthly"].copy()
+monthly["month_key"] = month_values(monthly["month_key"])
 monthly = monthly.dropna(subset=["month_key"]).sort_values("month_key")
 
-fig = px.line(
-    monthly,
-    x="month_key",
-    y=["revenue", "cost"],
-    markers=True,
-    title="Revenue vs Cost by Month",
-)
-st.plotly_chart(fig, use_container_width=True)
+st.plotly_chart(monthly_figure(monthly), use_container_width=True)
 
-job_gp = (
-    filtered_fact.groupby("job_no", dropna=False)
-    .agg(gp=("gross_profit", "sum"))
-    .reset_index()
-)
-job_gp = job_gp.sort_values("gp", ascending=False)
+job_gp = overview["job_gp"]
 
 col_left, col_right = st.columns(2)
 
@@ -74,20 +68,8 @@ with col_right:
     st.subheader("Bottom 20 Jobs by GP")
     st.dataframe(job_gp.tail(20), use_container_width=True)
 
-unquoted = (
-    filtered_fact[filtered_fact["is_unquoted_task"]]
-    .groupby("job_no", dropna=False)
-    .agg(unquoted_hours=("total_hours", "sum"))
-    .reset_index()
-    .sort_values("unquoted_hours", ascending=False)
-)
-
-overruns = (
-    filtered_fact.groupby(["job_no", "task_name"], dropna=False)
-    .agg(quote_hour_variance=("quote_hour_variance", "sum"))
-    .reset_index()
-    .sort_values("quote_hour_variance", ascending=False)
-)
+unquoted = overview["unquoted"]
+overruns = overview["overruns"]
 
 col_left, col_right = st.columns(2)
 
@@ -2,9 +2,21 @@ from __future__ import annotations
 
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 
-from src.app_state import apply_filters, get_data, sidebar_base_controls, sidebar_filters
+from src.app_state import apply_filters, get_data, job_options, month_values, sidebar_base_controls, sidebar_filters
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def monthly_figure(monthly: pd.DataFrame) -> go.Figure:
+    return px.line(
+        monthly,
+        x="month_key",
+        y=["revenue", "cost", "gp"],
+        markers=True,
+        title="Monthly Revenue, Cost, and GP",
+    )
 
 
 st.header("Job Drilldown")
@@ -21,44 +33,48 @@ data = get_data(
 filters = sidebar_filters(data["fact"], base)
 filtered_fact = apply_filters(data["fact"], filters)
 
-job_options = sorted({j for j in filtered_fact["job_no"].dropna().unique() if j != ""})
-job_no = st.selectbox("Select Job", job_options if job_options else [""])
+jobs = job_options(filtered_fact["job_no"])
+job_no = st.selectbox("Select Job", jobs if jobs else [""])
 
 job_fact = filtered_fact[filtered_fact["job_no"] == job_no]
 
 monthly = (
-    job_fact.groupby("month_key", dropna=False)
+    job_fact.groupby("month_key", dropna=False, observed=True, sort=False)
     .agg(revenue=("revenue_allocated", "sum"), cost=("total_cost", "sum"))
     .reset_index()
 )
-monthly["month_key"] = pd.to_datetime(monthly["month_key"], errors="coerce")
+monthly["month_key"] = month_values(monthly["month_key"])
 monthly = monthly.dropna(subset=["month_key"]).sort_values("month_key")
 monthly["gp"] = monthly["revenue"] - monthly["cost"]
 
-fig = px.line(
-    monthly,
-    x="month_key",
-    y=["revenue", "cost", "gp"],
-    markers=True,
-    title="Monthly Revenue, Cost, and GP",
-)
-st.plotly_chart(fig, use_container_width=True)
+st.plotly_chart(monthly_figure(monthly), use_container_width=True)
 
 summary = (
-    job_fact.groupby(["task_name"], dropna=False)
+    job_fact.groupby(["job_no", "task_name"], dropna=False, observed=True)
     .agg(
         total_hours=("total_hours", "sum"),
         total_cost=("total_cost", "sum"),
         revenue_allocated=("revenue_allocated", "sum"),
         gross_profit=("gross_profit", "sum"),
-        quoted_time=("quoted_time", "first"),
         quote_hour_variance=("quote_hour_variance", "sum"),
-        is_unquoted_task=("is_unquoted_task", "first"),
         is_unworked_task=("is_unworked_task", "first"),
-        is_unallocated_row=("is_unallocated_row", "first"),
     )
     .reset_index()
-)
+    .merge(data["task_dim"], on=["job_no", "task_name"], how="left")
+)[
+    [
+        "task_name",
+        "total_hours",
+        "total_cost",
+        "revenue_allocated",
+        "gross_profit",
+        "quoted_time",
+        "quote_hour_variance",
+        "is_unquoted_task",
+        "is_unworked_task",
+        "is_unallocated_row",
+    ]
+]
 
 st.subheader("Task Table")
 
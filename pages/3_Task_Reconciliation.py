@@ -1,9 +1,23 @@
 from __future__ import annotations
 
+from typing import Tuple
+
+import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 
-from src.app_state import apply_filters, get_data, sidebar_base_controls, sidebar_filters
+from src.app_state import apply_filters, get_data, job_options, sidebar_base_controls, sidebar_filters
+
+
+@st.cache_data(show_spinner=False)
+def summary_csv(summary: pd.DataFrame) -> bytes:
+    return summary.to_csv(index=False).encode("utf-8")
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def grouped_bar_figure(summary: pd.DataFrame, y: Tuple[str, str], title: str) -> go.Figure:
+    return px.bar(summary, x="task_name", y=list(y), barmode="group", title=title)
 
 
 st.header("Task Reconciliation")
@@ -20,49 +34,37 @@ data = get_data(
 filters = sidebar_filters(data["fact"], base)
 filtered_fact = apply_filters(data["fact"], filters)
 
-job_options = ["All Jobs"] + sorted({j for j in filtered_fact["job_no"].dropna().unique() if j != ""})
-job_no = st.selectbox("Job Filter", job_options)
+job_no = st.selectbox("Job Filter", ["All Jobs"] + job_options(filtered_fact["job_no"]))
 
 if job_no != "All Jobs":
     filtered_fact = filtered_fact[filtered_fact["job_no"] == job_no]
 
 summary = (
-    filtered_fact.groupby(["job_no", "task_name"], dropna=False)
+    filtered_fact.groupby(["job_no", "task_name"], dropna=False, observed=True)
     .agg(
         actual_hours=("total_hours", "sum"),
-        quoted_time=("quoted_time", "first"),
-        quoted_amount=("quoted_amount", "first"),
         revenue_allocated=("revenue_allocated", "sum"),
     )
     .reset_index()
-)
+    .merge(data["task_dim"], on=["job_no", "task_name"], how="left")
+)[["job_no", "task_name", "actual_hours", "quoted_time", "quoted_amount", "revenue_allocated"]]
 
-fig = px.bar(
-    summary,
-    x="task_name",
-    y=["quoted_time", "actual_hours"],
-    barmode="group",
-    title="Quoted vs Actual Hours",
+st.plotly_chart(
+    grouped_bar_figure(summary, ("quoted_time", "actual_hours"), "Quoted vs Actual Hours"),
+    use_container_width=True,
 )
-st.plotly_chart(fig, use_container_width=True)
-
-fig_amount = px.bar(
-    summary,
-    x="task_name",
-    y=["quoted_amount", "revenue_allocated"],
-    barmode="group",
-    title="Quoted Amount vs Allocated Revenue",
+st.plotly_chart(
+    grouped_bar_figure(summary, ("quoted_amount", "revenue_allocated"), "Quoted Amount vs Allocated Revenue"),
+    use_container_width=True,
 )
-st.plotly_chart(fig_amount, use_container_width=True)
 
 st.subheader("Filtered Tasks")
 
 st.dataframe(summary, use_container_width=True)
 
-csv_data = summary.to_csv(index=False)
 st.download_button(
     "Download Summary CSV",
-    data=csv_data,
+    data=summary_csv(summary),
     file_name="task_reconciliation.csv",
     mime="text/csv",
 )
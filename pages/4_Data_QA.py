@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
+import numpy as np
 import streamlit as st
 
 from src.app_state import apply_filters, get_data, sidebar_base_controls, sidebar_filters
@@ -33,23 +34,18 @@ if qa_path.exists():
 else:
     st.warning("QA report not found. Run the build script to generate it.")
 
-def _flag_col(name: str) -> bool:
-    return name in filtered_fact.columns
-
-
-mask = False
-if _flag_col("missing_base_rate_flag"):
-    mask = mask | filtered_fact["missing_base_rate_flag"]
-if _flag_col("had_negative_hours_flag"):
-    mask = mask | filtered_fact["had_negative_hours_flag"]
-if _flag_col("is_unallocated_row"):
-    mask = mask | filtered_fact["is_unallocated_row"]
-if _flag_col("is_unquoted_task"):
-    mask = mask | filtered_fact["is_unquoted_task"]
-if _flag_col("dept_match_status"):
-    mask = mask | filtered_fact["dept_match_status"].eq("MISMATCH")
-
-flags = filtered_fact[mask] if mask is not False else filtered_fact.iloc[0:0]
+flag_columns = [
+    col
+    for col in ("missing_base_rate_flag", "had_negative_hours_flag", "is_unallocated_row", "is_unquoted_task")
+    if col in filtered_fact.columns
+]
+masks = []
+if flag_columns:
+    masks.append(filtered_fact[flag_columns].eq(True).to_numpy(dtype=bool, na_value=False).any(axis=1))
+if "dept_match_status" in filtered_fact.columns:
+    masks.append(filtered_fact["dept_match_status"].eq("MISMATCH").to_numpy())
+
+flags = filtered_fact.iloc[np.logical_or.reduce(masks)] if masks else filtered_fact.iloc[0:0]
 
 st.subheader("Flagged Rows")
 if flags.empty:
@@ -3,7 +3,8 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from src.build import build_dataset
+from src.build import build_dataset, build_is_current
+from src.utils import get_logger
 
 
 def parse_args() -> argparse.Namespace:
@@ -15,15 +16,29 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Include all revenue months instead of FY-limited window",
     )
+    parser.add_argument(
+        "--write-csv",
+        action="store_true",
+        help="Also write CSV copies of the processed tables",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the processed outputs match the current inputs",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    if not (args.force or args.write_csv) and build_is_current(args.input, args.fy, args.include_all_history):
+        get_logger().info("Processed outputs are up to date; use --force to rebuild")
+        return
     build_dataset(
         input_path=Path(args.input),
         fy=args.fy,
         include_all_history=args.include_all_history,
+        write_csv=args.write_csv,
     )
 
 
@@ -3,7 +3,11 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-import pandas as pd
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+
+BATCH_SIZE = 65_536
 
 
 def parse_args() -> argparse.Namespace:
@@ -15,8 +19,10 @@ def parse_args() -> argparse.Namespace:
 
 def main() -> None:
     args = parse_args()
-    df = pd.read_parquet(Path(args.input))
-    df.to_csv(Path(args.output), index=False)
+    parquet_file = pq.ParquetFile(Path(args.input))
+    with pacsv.CSVWriter(str(Path(args.output)), parquet_file.schema_arrow) as writer:
+        for batch in parquet_file.iter_batches(batch_size=BATCH_SIZE):
+            writer.write_batch(batch)
 
 
 if __name__ == "__main__":
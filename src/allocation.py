@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Tuple
 
+import numpy as np
 import pandas as pd
 
 from src.utils import get_logger
@@ -15,11 +16,8 @@ def allocate_revenue(
     """Allocate job-month revenue to job-task-month by hours share."""
     logger = get_logger()
 
-    base = timesheet_task_month.copy()
-    revenue = revenue_monthly.copy()
-
-    base = base.merge(
-        revenue,
+    base = timesheet_task_month.merge(
+        revenue_monthly,
         on=["job_no", "month_key"],
         how="left",
         suffixes=("", "_revenue"),
@@ -28,23 +26,23 @@ def allocate_revenue(
         base["revenue_monthly"] = 0
     base["revenue_monthly"] = base["revenue_monthly"].fillna(0)
 
-    total_hours = (
-        base.groupby(["job_no", "month_key"], dropna=False)["total_hours"]
-        .sum()
-        .reset_index()
-        .rename(columns={"total_hours": "total_hours_job_month"})
-    )
+    job_month = base.groupby(["job_no", "month_key"], dropna=False, sort=False)
+    hours_by_job_month = job_month["total_hours"].sum()
+    job_month_hours = hours_by_job_month.to_numpy()[job_month.ngroup().to_numpy()]
+    total_hours = hours_by_job_month.rename("total_hours_job_month").reset_index()
 
-    base = base.merge(total_hours, on=["job_no", "month_key"], how="left")
-    base["task_share"] = 0.0
-    has_hours = base["total_hours_job_month"] > 0
-    base.loc[has_hours, "task_share"] = (
-        base.loc[has_hours, "total_hours"] / base.loc[has_hours, "total_hours_job_month"]
+    task_share = np.divide(
+        base["total_hours"].to_numpy(dtype=float),
+        job_month_hours,
+        out=np.zeros(len(base)),
+        where=job_month_hours > 0,
     )
-    base["revenue_allocated"] = base["task_share"] * base["revenue_monthly"]
+    base["total_hours_job_month"] = job_month_hours
+    base["task_share"] = task_share
+    base["revenue_allocated"] = task_share * base["revenue_monthly"].to_numpy(dtype=float)
     base["is_quote_only_task"] = False
 
-    revenue_only = revenue.merge(total_hours, on=["job_no", "month_key"], how="left")
+    revenue_only = revenue_monthly.merge(total_hours, on=["job_no", "month_key"], how="left")
     revenue_only["total_hours_job_month"] = revenue_only["total_hours_job_month"].fillna(0)
     needs_unallocated = revenue_only["total_hours_job_month"] <= 0
 
@@ -61,13 +59,11 @@ def allocate_revenue(
         unalloc["distinct_staff_count"] = 0
         unalloc["task_share"] = 0.0
         unalloc["revenue_allocated"] = unalloc["revenue_monthly"]
+        unalloc["is_quote_only_task"] = False
         unalloc["is_unallocated_row"] = True
 
-        for col in base.columns:
-            if col not in unalloc.columns:
-                unalloc[col] = None
         base["is_unallocated_row"] = False
-        base = pd.concat([base, unalloc[base.columns]], ignore_index=True)
+        base = pd.concat([base, unalloc.reindex(columns=base.columns)], ignore_index=True)
     else:
         base["is_unallocated_row"] = False
 
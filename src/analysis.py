@@ -18,22 +18,119 @@ METRIC_DEFINITIONS = {
     "Cost_Rate_Hr": {"name": "Cost Rate/Hr", "formula": "avg base rate", "desc": "Internal cost rate"},
 }
 
+MARGIN_BAND_EDGES = np.array([20, 35])
+MARGIN_BAND_LABELS = np.array(["At Risk", "Watch", "Healthy"])
+
+FY_MONTH_LABELS = np.array(["Jul", "Aug", "Sep", "Oct", "Nov", "Dec", "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Unknown"])
+
+SG_ALLOCATION_TASK = "Social Garden Invoice Allocation"
+
+CATEGORICAL_COLUMNS = (
+    "department_reporting",
+    "product",
+    "client",
+    "job_no",
+    "job_name",
+    "job_status",
+    "task_name",
+    "Calendar_Month",
+    "FY_Label",
+    "FY_Month_Label",
+)
+
+
+def _safe_ratio(num: np.ndarray, den: np.ndarray, scale: float = 1) -> np.ndarray:
+    out = np.zeros(len(num))
+    np.divide(num, den, out=out, where=den > 0)
+    if scale != 1:
+        out *= scale
+    return out
+
+
+def _derived_columns(g: pd.DataFrame, names: List[str], unquoted_full_overrun: bool = False) -> pd.DataFrame:
+    # Every derived column comes from the six summed arrays, so compute them on
+    # NumPy directly and attach the requested ones with a single concat.
+    q = g["quoted_amount"].to_numpy(dtype=float)
+    c = g["base_cost"].to_numpy(dtype=float)
+    b = g["billable_value"].to_numpy(dtype=float)
+    hq = g["quoted_hours"].to_numpy(dtype=float)
+    ha = g["actual_hours"].to_numpy(dtype=float)
+    eq = g["expected_quote"].to_numpy(dtype=float)
+
+    quoted_margin = q - c
+    actual_margin = b - c
+    hours_variance = ha - hq
+    quote_gap = q - eq
+    margin_pct = _safe_ratio(quoted_margin, q, 100)
+    billable_margin_pct = _safe_ratio(actual_margin, b, 100)
+    hours_variance_pct = _safe_ratio(hours_variance, hq, 100)
+    if unquoted_full_overrun:
+        hours_variance_pct[~(hq > 0) & (ha > 0)] = 100
+    is_overrun = hours_variance > 0
+    is_loss = quoted_margin < 0
+    is_underquoted = quote_gap < 0
+
+    columns = {
+        "margin": quoted_margin,
+        "quoted_margin": quoted_margin,
+        "actual_margin": actual_margin,
+        "margin_variance": actual_margin - quoted_margin,
+        "margin_pct": margin_pct,
+        "quoted_margin_pct": margin_pct,
+        "billable_margin_pct": billable_margin_pct,
+        "actual_margin_pct": billable_margin_pct,
+        "quoted_rate_hr": _safe_ratio(q, hq),
+        "billable_rate_hr": _safe_ratio(b, ha),
+        "cost_rate_hr": _safe_ratio(c, ha),
+        "effective_rate_hr": _safe_ratio(q, ha),
+        "hours_variance": hours_variance,
+        "hours_variance_pct": hours_variance_pct,
+        "quote_gap": quote_gap,
+        "quote_gap_pct": _safe_ratio(quote_gap, eq, 100),
+        "is_unquoted": (hq == 0) & (ha > 0),
+        "is_overrun": is_overrun,
+        "is_loss": is_loss,
+        "is_underquoted": is_underquoted,
+        "flag_bits": (
+            is_loss.view(np.uint8) | (is_underquoted.view(np.uint8) << 1) | (is_overrun.view(np.uint8) << 2)
+        ).astype(np.uint8),
+    }
+    derived = pd.DataFrame({name: columns[name] for name in names}, index=g.index)
+    return pd.concat([g, derived], axis=1)
+
+
+def _per_row(values: np.ndarray, codes: np.ndarray, missing: object) -> np.ndarray:
+    if codes.size and codes.min() < 0:
+        values = np.append(values, missing)
+    return values[codes]
+
 
 def _month_fields(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["month_key"] = pd.to_datetime(df["month_key"], errors="coerce")
-    df["Calendar_Month"] = df["month_key"].dt.strftime("%b %Y")
-    fy = df["month_key"].dt.year + (df["month_key"].dt.month >= 7).astype(int)
-    df["Fiscal_Year"] = fy
-    df["FY_Label"] = df["Fiscal_Year"].apply(lambda v: f"FY{str(int(v))[-2:]}" if pd.notna(v) else "Unknown")
-    fy_month = df["month_key"].dt.month.apply(lambda m: m - 6 if m >= 7 else m + 6)
-    df["FY_Month"] = fy_month
-    df["FY_Month_Label"] = df["FY_Month"].apply(
-        lambda m: ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec", "Jan", "Feb", "Mar", "Apr", "May", "Jun"][int(m) - 1]
-        if pd.notna(m) and 1 <= int(m) <= 12
-        else "Unknown"
+    month_key = df["month_key"]
+    if not pd.api.types.is_datetime64_any_dtype(month_key):
+        month_key = pd.to_datetime(month_key, errors="coerce")
+    # Derive the fields for each distinct month, then broadcast through the codes;
+    # NaT has code -1 and picks the trailing missing value.
+    month_codes, months = pd.factorize(month_key)
+    month_index = months.to_numpy("datetime64[M]").astype(np.int64)
+    month = month_index % 12 + 1
+    fy = month_index // 12 + 1970 + (month >= 7)
+    fy_month = np.where(month >= 7, month - 6, month + 6)
+    return df.assign(
+        month_key=month_key,
+        Calendar_Month=_per_row(months.strftime("%b %Y").to_numpy(dtype=object), month_codes, np.nan),
+        Fiscal_Year=_per_row(fy, month_codes, np.nan),
+        FY_Label=_per_row(np.array([f"FY{str(v)[-2:]}" for v in fy], dtype=object), month_codes, "Unknown"),
+        FY_Month=_per_row(fy_month, month_codes, np.nan),
+        FY_Month_Label=_per_row(FY_MONTH_LABELS[fy_month - 1], month_codes, "Unknown"),
     )
-    return df
+
+
+def _sg_allocation_mask(task_name: pd.Series) -> np.ndarray:
+    # Test each distinct task name once and broadcast through the category codes.
+    task_name = task_name.astype("category")
+    is_sg = task_name.cat.categories.astype(str).str.strip() == SG_ALLOCATION_TASK
+    return np.append(is_sg, False)[task_name.cat.codes.to_numpy()]
 
 
 def apply_filters(
@@ -51,29 +148,37 @@ def apply_filters(
         "excluded_other_dept": 0,
         "final_records": 0,
     }
-    df_f = df.copy()
+    # Each count is taken against the rows kept by the earlier stages, so the
+    # reconciliation reads the same as filtering stage by stage.
+    keep = np.ones(len(df), dtype=bool)
+    kept = len(df)
 
     if exclude_sg_allocation:
-        mask = df_f["task_name"].astype(str).str.strip().eq("Social Garden Invoice Allocation")
-        recon["excluded_sg_allocation"] = int(mask.sum())
-        df_f = df_f[~mask]
+        if "is_sg_allocation" in df.columns:
+            mask = df["is_sg_allocation"].to_numpy(dtype=bool)
+        else:
+            mask = _sg_allocation_mask(df["task_name"])
+        keep &= ~mask
+        recon["excluded_sg_allocation"] = kept - int(np.count_nonzero(keep))
+        kept -= recon["excluded_sg_allocation"]
 
     if billable_only:
-        mask = (df_f["billable_rate_hr"] > 0) & (df_f["cost_rate_hr"] > 0)
-        recon["excluded_non_billable"] = int((~mask).sum())
-        df_f = df_f[mask]
+        keep &= (df["billable_rate_hr"].to_numpy() > 0) & (df["cost_rate_hr"].to_numpy() > 0)
+        recon["excluded_non_billable"] = kept - int(np.count_nonzero(keep))
+        kept -= recon["excluded_non_billable"]
 
     if fiscal_year is not None:
-        mask = df_f["Fiscal_Year"] == fiscal_year
-        recon["excluded_other_fy"] = int((~mask).sum())
-        df_f = df_f[mask]
+        keep &= (df["Fiscal_Year"] == fiscal_year).to_numpy()
+        recon["excluded_other_fy"] = kept - int(np.count_nonzero(keep))
+        kept -= recon["excluded_other_fy"]
 
     if department is not None:
-        mask = df_f["department_reporting"] == department
-        recon["excluded_other_dept"] = int((~mask).sum())
-        df_f = df_f[mask]
+        keep &= (df["department_reporting"] == department).to_numpy()
+        recon["excluded_other_dept"] = kept - int(np.count_nonzero(keep))
+        kept -= recon["excluded_other_dept"]
 
-    recon["final_records"] = len(df_f)
+    recon["final_records"] = kept
+    df_f = df if kept == len(df) else df.iloc[np.flatnonzero(keep)]
     return df_f, recon
 
 
@@ -107,156 +212,84 @@ def get_available_fiscal_years(df: pd.DataFrame) -> List[int]:
     return sorted([int(y) for y in df["Fiscal_Year"].dropna().unique() if pd.notna(y)])
 
 
+def _distinct_values(values: pd.Series) -> List:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.remove_unused_categories().cat.categories.tolist()
+    return values.dropna().unique().tolist()
+
+
 def get_available_departments(df: pd.DataFrame) -> List[str]:
-    return sorted([d for d in df["department_reporting"].dropna().unique() if d])
+    return sorted([d for d in _distinct_values(df["department_reporting"]) if d])
 
 
 def get_available_products(df: pd.DataFrame, department: Optional[str] = None) -> List[str]:
     if department:
-        prods = df[df["department_reporting"] == department]["product"].dropna().unique()
+        prods = _distinct_values(df.loc[df["department_reporting"] == department, "product"])
     else:
-        prods = df["product"].dropna().unique()
+        prods = _distinct_values(df["product"])
     return sorted([p for p in prods if p])
 
 
-def compute_monthly_summary(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["Month_Sort"] = df["month_key"].dt.to_period("M")
-
-    g = df.groupby(["Month_Sort", "Calendar_Month", "Fiscal_Year", "FY_Month"]).agg(
-        quoted_hours=("quoted_hours", "sum"),
-        quoted_amount=("quoted_amount", "sum"),
-        actual_hours=("actual_hours", "sum"),
-        billable_value=("billable_value", "sum"),
-        base_cost=("total_cost", "sum"),
-        expected_quote=("expected_quote", "sum"),
-        job_count=("job_no", pd.Series.nunique),
-    ).reset_index()
+SUMMARY_SUMS = {
+    "quoted_hours": ("quoted_hours", "sum"),
+    "quoted_amount": ("quoted_amount", "sum"),
+    "actual_hours": ("actual_hours", "sum"),
+    "billable_value": ("billable_value", "sum"),
+    "base_cost": ("total_cost", "sum"),
+    "expected_quote": ("expected_quote", "sum"),
+}
 
+MONTH_KEYS = ["Month_Sort", "Calendar_Month", "Fiscal_Year", "FY_Month"]
+
+MONTHLY_DERIVED_COLUMNS = [
+    "quoted_margin", "actual_margin", "margin_variance", "quoted_margin_pct", "actual_margin_pct",
+    "quoted_rate_hr", "effective_rate_hr", "cost_rate_hr",
+    "hours_variance", "hours_variance_pct", "quote_gap", "quote_gap_pct",
+]
+BREAKDOWN_DERIVED_COLUMNS = [
+    "quoted_margin", "actual_margin", "margin_variance", "actual_margin_pct", "quote_gap", "quote_gap_pct",
+]
+GROUP_DERIVED_COLUMNS = [
+    "margin", "quoted_margin", "actual_margin", "margin_variance", "margin_pct", "billable_margin_pct",
+    "quoted_rate_hr", "billable_rate_hr", "cost_rate_hr",
+    "hours_variance", "hours_variance_pct", "quote_gap", "quote_gap_pct",
+]
+JOB_DERIVED_COLUMNS = [
+    "margin", "quoted_margin", "actual_margin", "margin_variance", "margin_pct", "billable_margin_pct",
+    "quoted_rate_hr", "billable_rate_hr", "cost_rate_hr", "effective_rate_hr",
+    "hours_variance", "hours_variance_pct", "quote_gap", "quote_gap_pct",
+    "is_overrun", "is_loss", "is_underquoted", "flag_bits",
+]
+TASK_DERIVED_COLUMNS = [
+    "margin", "quoted_margin", "actual_margin", "margin_variance", "margin_pct", "billable_margin_pct",
+    "hours_variance", "hours_variance_pct", "quote_gap", "quote_gap_pct", "is_unquoted", "is_overrun",
+]
+
+
+def _month_sort(df: pd.DataFrame) -> pd.Series:
+    if "Month_Sort" in df.columns:
+        return df["Month_Sort"]
+    return df["month_key"].dt.to_period("M").rename("Month_Sort")
+
+
+def _finish_monthly_summary(g: pd.DataFrame) -> pd.DataFrame:
     g = g.sort_values("Month_Sort").reset_index(drop=True)
+    return _derived_columns(g, MONTHLY_DERIVED_COLUMNS)
 
-    g["quoted_margin"] = g["quoted_amount"] - g["base_cost"]
-    g["actual_margin"] = g["billable_value"] - g["base_cost"]
-    g["margin_variance"] = g["actual_margin"] - g["quoted_margin"]
-    g["quoted_margin_pct"] = np.where(g["quoted_amount"] > 0, g["quoted_margin"] / g["quoted_amount"] * 100, 0)
-    g["actual_margin_pct"] = np.where(g["billable_value"] > 0, g["actual_margin"] / g["billable_value"] * 100, 0)
-
-    g["quoted_rate_hr"] = np.where(g["quoted_hours"] > 0, g["quoted_amount"] / g["quoted_hours"], 0)
-    g["effective_rate_hr"] = np.where(g["actual_hours"] > 0, g["quoted_amount"] / g["actual_hours"], 0)
-    g["cost_rate_hr"] = np.where(g["actual_hours"] > 0, g["base_cost"] / g["actual_hours"], 0)
-
-    g["hours_variance"] = g["actual_hours"] - g["quoted_hours"]
-    g["hours_variance_pct"] = np.where(g["quoted_hours"] > 0, g["hours_variance"] / g["quoted_hours"] * 100, 0)
-    g["quote_gap"] = g["quoted_amount"] - g["expected_quote"]
-    g["quote_gap_pct"] = np.where(g["expected_quote"] > 0, g["quote_gap"] / g["expected_quote"] * 100, 0)
 
-    return g
-
-
-def compute_monthly_by_department(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["Month_Sort"] = df["month_key"].dt.to_period("M")
-
-    g = df.groupby(["Month_Sort", "Calendar_Month", "department_reporting"]).agg(
-        quoted_hours=("quoted_hours", "sum"),
-        quoted_amount=("quoted_amount", "sum"),
-        actual_hours=("actual_hours", "sum"),
-        billable_value=("billable_value", "sum"),
-        base_cost=("total_cost", "sum"),
-        expected_quote=("expected_quote", "sum"),
-        job_count=("job_no", pd.Series.nunique),
-    ).reset_index()
+def _finish_monthly_breakdown(g: pd.DataFrame, sort_keys: List[str]) -> pd.DataFrame:
+    g = g.sort_values(sort_keys).reset_index(drop=True)
+    return _derived_columns(g, BREAKDOWN_DERIVED_COLUMNS)
 
-    g = g.sort_values(["Month_Sort", "department_reporting"]).reset_index(drop=True)
-    g["quoted_margin"] = g["quoted_amount"] - g["base_cost"]
-    g["actual_margin"] = g["billable_value"] - g["base_cost"]
-    g["margin_variance"] = g["actual_margin"] - g["quoted_margin"]
-    g["actual_margin_pct"] = np.where(g["billable_value"] > 0, g["actual_margin"] / g["billable_value"] * 100, 0)
-    g["quote_gap"] = g["quoted_amount"] - g["expected_quote"]
-    g["quote_gap_pct"] = np.where(g["expected_quote"] > 0, g["quote_gap"] / g["expected_quote"] * 100, 0)
 
-    return g
-
-
-def compute_monthly_by_product(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["Month_Sort"] = df["month_key"].dt.to_period("M")
-
-    g = df.groupby(["Month_Sort", "Calendar_Month", "department_reporting", "product"]).agg(
-        quoted_hours=("quoted_hours", "sum"),
-        quoted_amount=("quoted_amount", "sum"),
-        actual_hours=("actual_hours", "sum"),
-        billable_value=("billable_value", "sum"),
-        base_cost=("total_cost", "sum"),
-        expected_quote=("expected_quote", "sum"),
-        job_count=("job_no", pd.Series.nunique),
-    ).reset_index()
+def _finish_group_summary(g: pd.DataFrame) -> pd.DataFrame:
+    return _derived_columns(g, GROUP_DERIVED_COLUMNS)
 
-    g = g.sort_values(["Month_Sort", "department_reporting", "product"]).reset_index(drop=True)
-    g["quoted_margin"] = g["quoted_amount"] - g["base_cost"]
-    g["actual_margin"] = g["billable_value"] - g["base_cost"]
-    g["margin_variance"] = g["actual_margin"] - g["quoted_margin"]
-    g["actual_margin_pct"] = np.where(g["billable_value"] > 0, g["actual_margin"] / g["billable_value"] * 100, 0)
-    g["quote_gap"] = g["quoted_amount"] - g["expected_quote"]
-    g["quote_gap_pct"] = np.where(g["expected_quote"] > 0, g["quote_gap"] / g["expected_quote"] * 100, 0)
-
-    return g
-
-
-def compute_department_summary(df: pd.DataFrame) -> pd.DataFrame:
-    g = df.groupby("department_reporting").agg(
-        quoted_hours=("quoted_hours", "sum"),
-        quoted_amount=("quoted_amount", "sum"),
-        actual_hours=("actual_hours", "sum"),
-        billable_value=("billable_value", "sum"),
-        base_cost=("total_cost", "sum"),
-        expected_quote=("expected_quote", "sum"),
-        job_count=("job_no", pd.Series.nunique),
-        product_count=("product", pd.Series.nunique),
-    ).reset_index()
-
-    g["margin"] = g["quoted_amount"] - g["base_cost"]
-    g["quoted_margin"] = g["quoted_amount"] - g["base_cost"]
-    g["actual_margin"] = g["billable_value"] - g["base_cost"]
-    g["margin_variance"] = g["actual_margin"] - g["quoted_margin"]
-    g["margin_pct"] = np.where(g["quoted_amount"] > 0, g["quoted_margin"] / g["quoted_amount"] * 100, 0)
-    g["billable_margin_pct"] = np.where(g["billable_value"] > 0, g["actual_margin"] / g["billable_value"] * 100, 0)
-    g["quoted_rate_hr"] = np.where(g["quoted_hours"] > 0, g["quoted_amount"] / g["quoted_hours"], 0)
-    g["billable_rate_hr"] = np.where(g["actual_hours"] > 0, g["billable_value"] / g["actual_hours"], 0)
-    g["cost_rate_hr"] = np.where(g["actual_hours"] > 0, g["base_cost"] / g["actual_hours"], 0)
-    g["hours_variance"] = g["actual_hours"] - g["quoted_hours"]
-    g["hours_variance_pct"] = np.where(g["quoted_hours"] > 0, g["hours_variance"] / g["quoted_hours"] * 100, 0)
-    g["quote_gap"] = g["quoted_amount"] - g["expected_quote"]
-    g["quote_gap_pct"] = np.where(g["expected_quote"] > 0, g["quote_gap"] / g["expected_quote"] * 100, 0)
-
-    return g
-
-
-def compute_product_summary(df: pd.DataFrame) -> pd.DataFrame:
-    g = df.groupby(["department_reporting", "product"]).agg(
-        quoted_hours=("quoted_hours", "sum"),
-        quoted_amount=("quoted_amount", "sum"),
-        actual_hours=("actual_hours", "sum"),
-        billable_value=("billable_value", "sum"),
-        base_cost=("total_cost", "sum"),
-        expected_quote=("expected_quote", "sum"),
-        job_count=("job_no", pd.Series.nunique),
-    ).reset_index()
-
-    g["margin"] = g["quoted_amount"] - g["base_cost"]
-    g["quoted_margin"] = g["quoted_amount"] - g["base_cost"]
-    g["actual_margin"] = g["billable_value"] - g["base_cost"]
-    g["margin_variance"] = g["actual_margin"] - g["quoted_margin"]
-    g["margin_pct"] = np.where(g["quoted_amount"] > 0, g["quoted_margin"] / g["quoted_amount"] * 100, 0)
-    g["billable_margin_pct"] = np.where(g["billable_value"] > 0, g["actual_margin"] / g["billable_value"] * 100, 0)
-    g["quoted_rate_hr"] = np.where(g["quoted_hours"] > 0, g["quoted_amount"] / g["quoted_hours"], 0)
-    g["billable_rate_hr"] = np.where(g["actual_hours"] > 0, g["billable_value"] / g["actual_hours"], 0)
-    g["cost_rate_hr"] = np.where(g["actual_hours"] > 0, g["base_cost"] / g["actual_hours"], 0)
-    g["hours_variance"] = g["actual_hours"] - g["quoted_hours"]
-    g["hours_variance_pct"] = np.where(g["quoted_hours"] > 0, g["hours_variance"] / g["quoted_hours"] * 100, 0)
-    g["quote_gap"] = g["quoted_amount"] - g["expected_quote"]
-    g["quote_gap_pct"] = np.where(g["expected_quote"] > 0, g["quote_gap"] / g["expected_quote"] * 100, 0)
 
+def _finish_department_summary(g: pd.DataFrame) -> pd.DataFrame:
+    g = _finish_group_summary(g)
+    band = np.searchsorted(MARGIN_BAND_EDGES, g["margin_pct"].to_numpy(), side="right")
+    g["Margin_Band"] = MARGIN_BAND_LABELS[band]
     return g
 
 
@@ -272,7 +305,8 @@ def compute_job_summary(df: pd.DataFrame) -> pd.DataFrame:
             "Calendar_Month",
             "Fiscal_Year",
             "FY_Label",
-        ]
+        ],
+        observed=True,
     ).agg(
         quoted_hours=("quoted_hours", "sum"),
         quoted_amount=("quoted_amount", "sum"),
@@ -281,30 +315,11 @@ def compute_job_summary(df: pd.DataFrame) -> pd.DataFrame:
         base_cost=("total_cost", "sum"),
         expected_quote=("expected_quote", "sum"),
     ).reset_index()
-
-    g["margin"] = g["quoted_amount"] - g["base_cost"]
-    g["quoted_margin"] = g["quoted_amount"] - g["base_cost"]
-    g["actual_margin"] = g["billable_value"] - g["base_cost"]
-    g["margin_variance"] = g["actual_margin"] - g["quoted_margin"]
-    g["margin_pct"] = np.where(g["quoted_amount"] > 0, g["quoted_margin"] / g["quoted_amount"] * 100, 0)
-    g["billable_margin_pct"] = np.where(g["billable_value"] > 0, g["actual_margin"] / g["billable_value"] * 100, 0)
-    g["quoted_rate_hr"] = np.where(g["quoted_hours"] > 0, g["quoted_amount"] / g["quoted_hours"], 0)
-    g["billable_rate_hr"] = np.where(g["actual_hours"] > 0, g["billable_value"] / g["actual_hours"], 0)
-    g["cost_rate_hr"] = np.where(g["actual_hours"] > 0, g["base_cost"] / g["actual_hours"], 0)
-    g["effective_rate_hr"] = np.where(g["actual_hours"] > 0, g["quoted_amount"] / g["actual_hours"], 0)
-    g["hours_variance"] = g["actual_hours"] - g["quoted_hours"]
-    g["hours_variance_pct"] = np.where(g["quoted_hours"] > 0, g["hours_variance"] / g["quoted_hours"] * 100, np.where(g["actual_hours"] > 0, 100, 0))
-    g["quote_gap"] = g["quoted_amount"] - g["expected_quote"]
-    g["quote_gap_pct"] = np.where(g["expected_quote"] > 0, g["quote_gap"] / g["expected_quote"] * 100, 0)
-    g["is_overrun"] = g["hours_variance"] > 0
-    g["is_loss"] = g["margin"] < 0
-    g["is_underquoted"] = g["quote_gap"] < 0
-
-    return g
+    return _derived_columns(g, JOB_DERIVED_COLUMNS, unquoted_full_overrun=True)
 
 
 def compute_task_summary(df: pd.DataFrame) -> pd.DataFrame:
-    g = df.groupby(
+    grouped = df.groupby(
         [
             "department_reporting",
             "product",
@@ -314,33 +329,46 @@ def compute_task_summary(df: pd.DataFrame) -> pd.DataFrame:
             "Fiscal_Year",
             "FY_Label",
             "Calendar_Month",
-        ]
-    ).agg(
-        quoted_hours=("quoted_hours", "sum"),
-        quoted_amount=("quoted_amount", "sum"),
-        actual_hours=("actual_hours", "sum"),
-        billable_value=("billable_value", "sum"),
-        base_cost=("total_cost", "sum"),
-        expected_quote=("expected_quote", "sum"),
-        billable_rate_hr=("billable_rate_hr", "mean"),
-        cost_rate_hr=("cost_rate_hr", "mean"),
-        quoted_rate_hr=("quoted_rate_hr", "mean"),
-    ).reset_index()
-
-    g["margin"] = g["quoted_amount"] - g["base_cost"]
-    g["quoted_margin"] = g["quoted_amount"] - g["base_cost"]
-    g["actual_margin"] = g["billable_value"] - g["base_cost"]
-    g["margin_variance"] = g["actual_margin"] - g["quoted_margin"]
-    g["margin_pct"] = np.where(g["quoted_amount"] > 0, g["quoted_margin"] / g["quoted_amount"] * 100, 0)
-    g["billable_margin_pct"] = np.where(g["billable_value"] > 0, g["actual_margin"] / g["billable_value"] * 100, 0)
-    g["hours_variance"] = g["actual_hours"] - g["quoted_hours"]
-    g["hours_variance_pct"] = np.where(g["quoted_hours"] > 0, g["hours_variance"] / g["quoted_hours"] * 100, np.where(g["actual_hours"] > 0, 100, 0))
-    g["quote_gap"] = g["quoted_amount"] - g["expected_quote"]
-    g["quote_gap_pct"] = np.where(g["expected_quote"] > 0, g["quote_gap"] / g["expected_quote"] * 100, 0)
-    g["is_unquoted"] = (g["quoted_hours"] == 0) & (g["actual_hours"] > 0)
-    g["is_overrun"] = g["hours_variance"] > 0
-
-    return g
+        ],
+        observed=True,
+    )
+    sums = grouped[
+        ["quoted_hours", "quoted_amount", "actual_hours", "billable_value", "total_cost", "expected_quote"]
+    ].sum()
+    means = grouped[["billable_rate_hr", "cost_rate_hr", "quoted_rate_hr"]].mean()
+    g = pd.concat([sums.rename(columns={"total_cost": "base_cost"}), means], axis=1).reset_index()
+    return _derived_columns(g, TASK_DERIVED_COLUMNS, unquoted_full_overrun=True)
+
+
+def _rollup(base: pd.DataFrame, keys: List[str], count_columns: Dict[str, str]) -> pd.DataFrame:
+    grouped = base.groupby(keys, observed=True)
+    counts = [grouped[column].nunique().rename(name) for name, column in count_columns.items()]
+    return pd.concat([grouped[list(SUMMARY_SUMS)].sum()] + counts, axis=1).reset_index()
+
+
+def compute_all_summaries(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    # One pass at job x month grain; the month, department and product levels
+    # roll up from it, and job_count stays exact because each base row is one job.
+    base_keys = MONTH_KEYS + ["department_reporting", "product", "job_no"]
+    base = (
+        df.groupby([_month_sort(df)] + base_keys[1:], dropna=False, observed=True)
+        .agg(**SUMMARY_SUMS)
+        .reset_index()
+    )
+    jobs = {"job_count": "job_no"}
+    return {
+        "monthly": _finish_monthly_summary(_rollup(base, MONTH_KEYS, jobs)),
+        "monthly_by_department": _finish_monthly_breakdown(
+            _rollup(base, ["Month_Sort", "Calendar_Month", "department_reporting"], jobs),
+            ["Month_Sort", "department_reporting"],
+        ),
+        "department": _finish_department_summary(
+            _rollup(base, ["department_reporting"], {**jobs, "product_count": "product"})
+        ),
+        "product": _finish_group_summary(_rollup(base, ["department_reporting", "product"], jobs)),
+        "job": compute_job_summary(df),
+        "task": compute_task_summary(df),
+    }
 
 
 def generate_insights(
@@ -381,37 +409,39 @@ def generate_insights(
     else:
         insights["headline"].append(f"Healthy overall margin at {overall_margin:.1f}%")
 
-    loss_jobs = job_summary[job_summary["is_loss"]]
-    if len(loss_jobs) > 0:
-        total_losses = loss_jobs["margin"].sum()
+    loss_rows = np.flatnonzero(job_summary["is_loss"].to_numpy(dtype=bool))
+    loss_margins = job_summary["margin"].to_numpy()[loss_rows]
+    if len(loss_rows) > 0:
         insights["headline"].append(
-            f"{len(loss_jobs)} jobs running at a loss, totaling ${abs(total_losses):,.0f}"
+            f"{len(loss_rows)} jobs running at a loss, totaling ${abs(loss_margins.sum()):,.0f}"
         )
 
     if len(dept_summary) > 0:
-        worst_dept = dept_summary.loc[dept_summary["billable_margin_pct"].idxmin()]
-        best_dept = dept_summary.loc[dept_summary["billable_margin_pct"].idxmax()]
-        if worst_dept["billable_margin_pct"] < 15:
+        dept_names = dept_summary["department_reporting"].to_numpy()
+        dept_margins = dept_summary["billable_margin_pct"].to_numpy()
+        worst, best = np.argmin(dept_margins), np.argmax(dept_margins)
+        if dept_margins[worst] < 15:
             insights["margin_drivers"].append(
-                f"{worst_dept['department_reporting']} dragging margins at {worst_dept['billable_margin_pct']:.1f}%"
+                f"{dept_names[worst]} dragging margins at {dept_margins[worst]:.1f}%"
             )
-        if best_dept["billable_margin_pct"] > 40:
+        if dept_margins[best] > 40:
             insights["margin_drivers"].append(
-                f"{best_dept['department_reporting']} leading with {best_dept['billable_margin_pct']:.1f}% margin"
+                f"{dept_names[best]} leading with {dept_margins[best]:.1f}% margin"
             )
 
-    underquoted = job_summary[job_summary["quote_gap_pct"] < 0]
-    if len(underquoted) > 0:
+    n_underquoted = int(np.count_nonzero(job_summary["quote_gap_pct"].to_numpy() < 0))
+    if n_underquoted > 0:
         insights["quoting_accuracy"].append(
-            f"{len(underquoted)} jobs underquoted vs internal benchmark"
+            f"{n_underquoted} jobs underquoted vs internal benchmark"
         )
 
-    unquoted_tasks = task_summary[task_summary["is_unquoted"]]
-    if len(unquoted_tasks) > 0:
-        unquoted_cost = unquoted_tasks["base_cost"].sum()
-        unquoted_hours = unquoted_tasks["actual_hours"].sum()
+    unquoted = task_summary["is_unquoted"].to_numpy(dtype=bool)
+    n_unquoted = int(np.count_nonzero(unquoted))
+    if n_unquoted > 0:
+        unquoted_cost = np.nansum(task_summary["base_cost"].to_numpy()[unquoted])
+        unquoted_hours = np.nansum(task_summary["actual_hours"].to_numpy()[unquoted])
         insights["quoting_accuracy"].append(
-            f"{len(unquoted_tasks)} unquoted tasks detected — {unquoted_hours:,.0f} hours at ${unquoted_cost:,.0f} cost"
+            f"{n_unquoted} unquoted tasks detected — {unquoted_hours:,.0f} hours at ${unquoted_cost:,.0f} cost"
         )
 
     if len(monthly_summary) >= 3:
@@ -427,28 +457,32 @@ def generate_insights(
                     f"Margins declining — down {margin_trend[-3] - margin_trend[-1]:.1f}pp over last 3 months"
                 )
 
-    if len(loss_jobs) > 0:
-        top_loss = loss_jobs.nsmallest(3, "margin")
-        for _, job in top_loss.iterrows():
+    if len(loss_rows) > 0:
+        # A stable sort keeps the first of tied margins, as nsmallest does.
+        top_loss = loss_rows[np.argsort(loss_margins, kind="stable")[:3]]
+        job_names = job_summary["job_name"].to_numpy()
+        job_nos = job_summary["job_no"].to_numpy()
+        margins = job_summary["margin"].to_numpy()
+        for i in top_loss:
             insights["action_items"].append(
-                f"Review {job['job_name']} ({job['job_no']}) — ${job['margin']:,.0f} margin"
+                f"Review {job_names[i]} ({job_nos[i]}) — ${margins[i]:,.0f} margin"
             )
 
     return insights
 
 
+OVERALL_TOTAL_COLUMNS = ["quoted_amount", "billable_value", "base_cost", "quoted_hours", "actual_hours", "expected_quote"]
+
+
 def calculate_overall_metrics(js: pd.DataFrame) -> Dict[str, float]:
     n = len(js)
     if n == 0:
         return {"total_jobs": 0}
 
-    q = js["quoted_amount"].sum()
-    b = js["billable_value"].sum()
-    c = js["base_cost"].sum()
+    # One stacked reduction; each row is contiguous, so it sums like Series.sum().
+    totals = np.nansum(np.vstack([js[col].to_numpy(dtype=np.float64) for col in OVERALL_TOTAL_COLUMNS]), axis=1)
+    q, b, c, hq, ha, eq = totals
     p = q - c
-    hq = js["quoted_hours"].sum()
-    ha = js["actual_hours"].sum()
-    eq = js["expected_quote"].sum()
 
     quoted_margin = q - c
     actual_margin = b - c
@@ -477,27 +511,29 @@ def calculate_overall_metrics(js: pd.DataFrame) -> Dict[str, float]:
     metrics["quote_gap"] = float(q - eq)
     metrics["quote_gap_pct"] = float(((q - eq) / eq * 100) if eq > 0 else 0)
     metrics["avg_effective_rate_hr"] = float((q / ha) if ha > 0 else 0)
-    metrics["jobs_over_budget"] = int(js["is_overrun"].sum())
-    metrics["jobs_at_loss"] = int(js["is_loss"].sum())
-    metrics["jobs_underquoted"] = int(js["is_underquoted"].sum())
-    metrics["overrun_rate"] = float((js["is_overrun"].sum() / n * 100) if n > 0 else 0)
-    metrics["loss_rate"] = float((js["is_loss"].sum() / n * 100) if n > 0 else 0)
+    jobs_over_budget = np.count_nonzero(js["is_overrun"].to_numpy())
+    jobs_at_loss = np.count_nonzero(js["is_loss"].to_numpy())
+    metrics["jobs_over_budget"] = int(jobs_over_budget)
+    metrics["jobs_at_loss"] = int(jobs_at_loss)
+    metrics["jobs_underquoted"] = int(np.count_nonzero(js["is_underquoted"].to_numpy()))
+    metrics["overrun_rate"] = float((jobs_over_budget / n * 100) if n > 0 else 0)
+    metrics["loss_rate"] = float((jobs_at_loss / n * 100) if n > 0 else 0)
 
     return metrics
 
 
 def analyze_overrun_causes(ts: pd.DataFrame) -> Dict[str, Dict[str, float]]:
-    unq = ts[ts["is_unquoted"]]
-    ovr = ts[(ts["is_overrun"]) & (~ts["is_unquoted"])]
+    unq = ts["is_unquoted"].to_numpy(dtype=bool)
+    ovr = ts["is_overrun"].to_numpy(dtype=bool) & ~unq
     return {
         "scope_creep": {
-            "count": int(len(unq)),
-            "cost": float(unq["base_cost"].sum()),
-            "hours": float(unq["actual_hours"].sum()),
+            "count": int(np.count_nonzero(unq)),
+            "cost": float(np.nansum(ts["base_cost"].to_numpy()[unq])),
+            "hours": float(np.nansum(ts["actual_hours"].to_numpy()[unq])),
         },
         "underestimation": {
-            "count": int(len(ovr)),
-            "excess_hours": float(ovr["hours_variance"].sum()),
+            "count": int(np.count_nonzero(ovr)),
+            "excess_hours": float(np.nansum(ts["hours_variance"].to_numpy()[ovr])),
         },
     }
 
@@ -554,9 +590,9 @@ def diagnose_job_margin(job_row: pd.Series, job_tasks: pd.DataFrame) -> Dict[str
         diagnosis["issues"].append("Significant underrun")
 
     if len(job_tasks) > 0:
-        unquoted_tasks = job_tasks[job_tasks["is_unquoted"]]
-        if len(unquoted_tasks) > 0:
-            diagnosis["issues"].append(f"{len(unquoted_tasks)} unquoted tasks")
+        n_unquoted = int(np.count_nonzero(job_tasks["is_unquoted"].to_numpy(dtype=bool)))
+        if n_unquoted > 0:
+            diagnosis["issues"].append(f"{n_unquoted} unquoted tasks")
             diagnosis["root_causes"].append("Scope changes not quoted")
             diagnosis["recommendations"].append("Implement change order process")
 
@@ -569,25 +605,32 @@ def compute_builder_task_stats(
     department: Optional[str] = None,
     product: Optional[str] = None,
 ) -> pd.DataFrame:
-    fact_filter = fact.copy()
+    fact_filter = fact
     if department:
         fact_filter = fact_filter[fact_filter["department_reporting"] == department]
     if product:
         fact_filter = fact_filter[fact_filter["product"] == product]
 
-    keys = fact_filter[["job_no", "task_name"]].drop_duplicates()
-    if keys.empty:
+    if fact_filter.empty:
         return pd.DataFrame()
 
-    ts = timesheet_task_month.copy()
-    ts = ts.merge(keys, on=["job_no", "task_name"], how="inner")
+    # Encode (job, task) pairs against the fact's categories so the timesheet rows
+    # can be matched with an integer isin instead of a merge.
+    job_no = fact_filter["job_no"].astype("category")
+    task_name = fact_filter["task_name"].astype("category")
+    ts_job = pd.Categorical(timesheet_task_month["job_no"], categories=job_no.cat.categories).codes
+    ts_task = pd.Categorical(timesheet_task_month["task_name"], categories=task_name.cat.categories).codes
+    n_tasks = len(task_name.cat.categories)
+    fact_pairs = job_no.cat.codes.to_numpy(dtype=np.int64) * n_tasks + task_name.cat.codes.to_numpy()
+    ts_pairs = ts_job.astype(np.int64) * n_tasks + ts_task
+    keep = (ts_job >= 0) & (ts_task >= 0) & np.isin(ts_pairs, fact_pairs)
+    ts = timesheet_task_month.iloc[np.flatnonzero(keep)]
 
     total_jobs = ts["job_no"].nunique()
     stats = (
         ts.groupby("task_name")
         .agg(
             Jobs_With_Task=("job_no", "nunique"),
-            Avg_Quoted_Hours=("total_hours", "mean"),
             Avg_Actual_Hours=("total_hours", "mean"),
             Billable_Rate_Hr=("avg_billable_rate", "mean"),
             Cost_Rate_Hr=("avg_base_rate", "mean"),
@@ -595,19 +638,20 @@ def compute_builder_task_stats(
         )
         .reset_index()
     )
+    stats.insert(2, "Avg_Quoted_Hours", stats["Avg_Actual_Hours"])
     stats["Frequency_Pct"] = np.where(total_jobs > 0, (stats["Jobs_With_Task"] / total_jobs) * 100, 0)
     stats = stats.sort_values(["Frequency_Pct", "Avg_Actual_Hours"], ascending=False)
     return stats
 
 
 def prepare_fact_for_analysis(fact: pd.DataFrame) -> pd.DataFrame:
-    df = fact.copy()
-    df = _month_fields(df)
-    df["department_reporting"] = df.get("department_reporting", df.get("department", ""))
-    df["product"] = df.get("product", "")
-    df["job_name"] = df.get("job_name", "")
-    df["client"] = df.get("client", "")
-    df["job_status"] = df.get("job_status", "")
+    df = _month_fields(fact)
+    df["Month_Sort"] = df["month_key"].dt.to_period("M")
+    if "department_reporting" not in df.columns:
+        df["department_reporting"] = df["department"] if "department" in df.columns else ""
+    for col in ("product", "job_name", "client", "job_status"):
+        if col not in df.columns:
+            df[col] = ""
     if "quoted_hours" not in df.columns and "quoted_time" in df.columns:
         df["quoted_hours"] = df["quoted_time"]
     if "actual_hours" not in df.columns and "total_hours" in df.columns:
@@ -625,4 +669,12 @@ def prepare_fact_for_analysis(fact: pd.DataFrame) -> pd.DataFrame:
         df["expected_quote"] = df["quoted_hours"] * expected_rate
     if "quote_gap" not in df.columns:
         df["quote_gap"] = df["quoted_amount"] - df["expected_quote"]
+    for col, _ in SUMMARY_SUMS.values():
+        if col in df.columns and df[col].dtype != np.float64:
+            df[col] = df[col].astype(np.float64)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    if "task_name" in df.columns:
+        df["is_sg_allocation"] = _sg_allocation_mask(df["task_name"])
     return df
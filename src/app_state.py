@@ -1,28 +1,185 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import streamlit as st
 
-from src.build import build_dataset
+from src.build import build_dataset, build_is_current
 from src.utils import get_logger, load_settings
 
 
-@st.cache_data(show_spinner=False)
-def load_processed(processed_dir: str) -> Dict[str, pd.DataFrame]:
-    """Load processed parquet datasets."""
+PROCESSED_FILES = {
+    "revenue_monthly": "revenue_monthly.parquet",
+    "timesheet_task_month": "timesheet_task_month.parquet",
+    "quote_task": "quote_task.parquet",
+    "fact": "fact_job_task_month.parquet",
+    "job_month_summary": "job_month_summary.parquet",
+    "job_total_summary": "job_total_summary.parquet",
+    "quote_vs_actual_summary": "quote_vs_actual_summary.parquet",
+}
+
+# Columns the pages never read; they stay in the parquet outputs but are not
+# decoded when the app loads them. In-app rebuilds load through the same path,
+# so both data sources give the same schemas. The Data QA flagged-row view shows
+# whole fact rows, so the mixed-department and mixed-dimension QA fields and the raw
+# actual department and task name stay on the fact table.
+TIMESHEET_DIMENSION_COLUMNS = (
+    "distinct_staff_count",
+    "task_name_raw",
+    "department_actual",
+    "function",
+    "role",
+    "deliverable",
+)
+TIMESHEET_QA_COLUMNS = (
+    "mixed_department",
+    "dept_top_share",
+    "dept_second",
+    "dept_second_share",
+    "mixed_dimension_function",
+    "mixed_dimension_category",
+    "mixed_dimension_role",
+    "mixed_dimension_task",
+    "mixed_dimension_deliverable",
+)
+QUOTE_DETAIL_COLUMNS = (
+    "invoiced_time",
+    "invoiced_amount",
+    "task_name_raw",
+    "job_category",
+    "job_start_date",
+    "job_completed_date",
+    "quote_mixed_department",
+)
+FACT_QA_COLUMNS = ("department_actual", "task_name_raw")
+UNREAD_COLUMNS = {
+    "timesheet_task_month": TIMESHEET_DIMENSION_COLUMNS + TIMESHEET_QA_COLUMNS,
+    "quote_task": QUOTE_DETAIL_COLUMNS,
+    "fact": tuple(c for c in TIMESHEET_DIMENSION_COLUMNS + QUOTE_DETAIL_COLUMNS if c not in FACT_QA_COLUMNS)
+    + (
+        "Source",
+        "Account Manager",
+        "Industry",
+        "Client Group",
+        "FY",
+        "total_hours_job_month",
+        "task_share",
+        "task_name_raw_quote",
+        "total_hours_task",
+        "quote_amount_allocated",
+        "quote_amount_variance",
+        "margin_erosion_rate",
+        "margin_erosion",
+    ),
+}
+
+FACT_CATEGORICAL_COLUMNS = (
+    "job_no",
+    "task_name",
+    "month_key",
+    "department",
+    "department_reporting",
+    "department_quote",
+    "client",
+    "category",
+)
+FACT_FLAG_COLUMNS = ("missing_base_rate_flag", "had_negative_hours_flag")
+# fact.attrs entry naming the processed outputs a loaded fact came from,
+# so caches downstream of it can key on content rather than object identity.
+DATA_KEY_ATTR = "data_key"
+
+
+def frame_cache_key(df: pd.DataFrame) -> Tuple[int, Optional[str]]:
+    """Cache hash for shared frames: identity plus the data key, so a reused id cannot alias another dataset."""
+    return id(df), df.attrs.get(DATA_KEY_ATTR)
+
+
+def compact_fact(fact: pd.DataFrame) -> pd.DataFrame:
+    """Store repeated fact dimensions as categoricals and object flags as nullable booleans."""
+    if "month_key" in fact.columns and not pd.api.types.is_datetime64_any_dtype(fact["month_key"]):
+        fact["month_key"] = pd.to_datetime(fact["month_key"], errors="coerce")
+    for col in FACT_CATEGORICAL_COLUMNS:
+        if col in fact.columns:
+            fact[col] = fact[col].astype("category")
+    for col in FACT_FLAG_COLUMNS:
+        if col in fact.columns and fact[col].dtype == object:
+            fact[col] = fact[col].astype("boolean")
+    return fact
+
+
+def month_values(month_key: pd.Series) -> pd.Series:
+    """Return month keys as datetimes, decoding categoricals without reparsing."""
+    if isinstance(month_key.dtype, pd.CategoricalDtype):
+        return month_key.astype(month_key.cat.categories.dtype)
+    if pd.api.types.is_datetime64_any_dtype(month_key):
+        return month_key
+    return pd.to_datetime(month_key, errors="coerce")
+
+
+def present_values(values: pd.Series) -> List[str]:
+    """Return the sorted non-empty values present in a fact column."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        present = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories)) > 0
+        return sorted(v for v in values.cat.categories[present] if v != "")
+    return sorted({v for v in values.dropna().unique() if v != ""})
+
+
+def job_options(job_no: pd.Series) -> List[str]:
+    """Return the sorted non-empty job numbers present in a fact slice."""
+    return present_values(job_no)
+
+
+TASK_DIM_COLUMNS = ("quoted_time", "quoted_amount", "is_unquoted_task", "is_unallocated_row")
+
+
+def build_task_dim(fact: pd.DataFrame) -> pd.DataFrame:
+    """Build the per job-task attribute table that is constant across months."""
+    columns = ["job_no", "task_name"] + [c for c in TASK_DIM_COLUMNS if c in fact.columns]
+    return fact.drop_duplicates(["job_no", "task_name"])[columns].reset_index(drop=True)
+
+
+def processed_outputs_key(processed_dir: str) -> str:
+    """Fingerprint the processed parquet files by modification time and size."""
+    parts = []
+    for filename in PROCESSED_FILES.values():
+        path = Path(processed_dir) / filename
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{filename}:{stat.st_mtime_ns}:{stat.st_size}")
+        else:
+            parts.append(f"{filename}:missing")
+    return "|".join(parts)
+
+
+# Loaded and filtered frames are cached as shared resources so reruns skip the
+# pickle round-trip of st.cache_data; callers must treat them as read-only.
+# outputs_key ties an entry to the files on disk, so a rebuild (in the app or
+# from the CLI) is picked up instead of serving the frames loaded before it.
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_processed(
+    processed_dir: str,
+    columns: Optional[Dict[str, List[str]]] = None,
+    outputs_key: str = "",
+) -> Dict[str, pd.DataFrame]:
+    """Load processed parquet datasets, reading only the columns the app uses."""
     processed = Path(processed_dir)
-    datasets = {
-        "revenue_monthly": pd.read_parquet(processed / "revenue_monthly.parquet"),
-        "timesheet_task_month": pd.read_parquet(processed / "timesheet_task_month.parquet"),
-        "quote_task": pd.read_parquet(processed / "quote_task.parquet"),
-        "fact": pd.read_parquet(processed / "fact_job_task_month.parquet"),
-        "job_month_summary": pd.read_parquet(processed / "job_month_summary.parquet"),
-        "job_total_summary": pd.read_parquet(processed / "job_total_summary.parquet"),
-        "quote_vs_actual_summary": pd.read_parquet(processed / "quote_vs_actual_summary.parquet"),
-    }
+    datasets = {}
+    for name, filename in PROCESSED_FILES.items():
+        path = processed / filename
+        if columns and name in columns:
+            read_columns = list(columns[name])
+        else:
+            unread = set(UNREAD_COLUMNS.get(name, ()))
+            read_columns = [c for c in pq.read_schema(path).names if c not in unread]
+        datasets[name] = pq.read_table(path, columns=read_columns, memory_map=True).to_pandas()
+    datasets["fact"] = compact_fact(datasets["fact"])
+    datasets["fact"].attrs[DATA_KEY_ATTR] = outputs_key
+    datasets["task_dim"] = build_task_dim(datasets["fact"])
     return datasets
 
 
@@ -44,48 +201,25 @@ def get_data(
             st.error(f"Excel file not found: {excel_path}")
             st.stop()
 
-        @st.cache_data(show_spinner=True)
-        def _build_cached(
-            input_path: str,
-            fy: str,
-            include_all_history: bool,
-            settings_path: str,
-            input_mtime: float,
-            map_mtime: float,
-            dept_map_mtime: float,
-        ) -> Dict[str, pd.DataFrame]:
+        if build_is_current(excel_path, fy, include_all_history, settings_path):
+            try:
+                return load_processed(processed_dir, outputs_key=processed_outputs_key(processed_dir))
+            except FileNotFoundError:
+                logger.info("Processed outputs missing; rebuilding")
+        # The build writes the parquet outputs, so the rebuilt data is loaded (and
+        # cached) like any other processed outputs rather than held separately.
+        with st.spinner("Rebuilding datasets from Excel"):
             logger.info("Rebuilding datasets from Excel")
-            result = build_dataset(
-                input_path=input_path,
+            build_dataset(
+                input_path=excel_path,
                 fy=fy,
                 include_all_history=include_all_history,
                 settings_path=settings_path,
             )
-            return {
-                "revenue_monthly": result.revenue_monthly,
-                "timesheet_task_month": result.timesheet_task_month,
-                "quote_task": result.quote_task,
-                "fact": result.fact,
-                "job_month_summary": result.job_month_summary,
-                "job_total_summary": result.job_total_summary,
-                "quote_vs_actual_summary": result.quote_vs_actual_summary,
-            }
-
-        map_path = Path("config/task_name_map.csv")
-        dept_map_path = Path(settings.get("department_map_path", "config/department_map.csv"))
-        data = _build_cached(
-            input_path=str(excel_path),
-            fy=fy,
-            include_all_history=include_all_history,
-            settings_path=settings_path,
-            input_mtime=excel_path.stat().st_mtime,
-            map_mtime=map_path.stat().st_mtime if map_path.exists() else 0.0,
-            dept_map_mtime=dept_map_path.stat().st_mtime if dept_map_path.exists() else 0.0,
-        )
-        return data
+        return load_processed(processed_dir, outputs_key=processed_outputs_key(processed_dir))
 
     try:
-        return load_processed(processed_dir)
+        return load_processed(processed_dir, outputs_key=processed_outputs_key(processed_dir))
     except FileNotFoundError:
         st.error("Processed data not found. Run the build script or choose 'Rebuild from Excel'.")
         st.stop()
@@ -113,12 +247,28 @@ def sidebar_base_controls(settings_path: str = "config/settings.yaml") -> Dict[s
     }
 
 
+@st.cache_data(show_spinner=False, max_entries=4, hash_funcs={pd.DataFrame: frame_cache_key})
+def filter_options(fact: pd.DataFrame) -> Dict[str, object]:
+    """Return the sidebar month bounds and option lists for a loaded fact table."""
+    month_key = fact["month_key"]
+    months = month_key.cat.categories if isinstance(month_key.dtype, pd.CategoricalDtype) else month_values(month_key)
+    dept_reporting = present_values(fact.get("department_reporting", pd.Series(dtype=str)))
+    dept_quote = present_values(fact.get("department_quote", pd.Series(dtype=str)))
+    return {
+        "min_month": months.min(),
+        "max_month": months.max(),
+        "departments": sorted(set(dept_reporting).union(dept_quote)),
+        "clients": present_values(fact.get("client", pd.Series(dtype=str))),
+        "categories": present_values(fact.get("category", pd.Series(dtype=str))),
+        "jobs": job_options(fact["job_no"]),
+    }
+
+
 def sidebar_filters(fact: pd.DataFrame, base: Dict[str, object]) -> Dict[str, object]:
     """Render sidebar controls and return filter selections."""
-
-    month_series = pd.to_datetime(fact["month_key"], errors="coerce")
-    min_month = month_series.min()
-    max_month = month_series.max()
+    options = filter_options(fact)
+    min_month = options["min_month"]
+    max_month = options["max_month"]
     if pd.isna(min_month) or pd.isna(max_month):
         min_month = pd.Timestamp("2025-07-01")
         max_month = pd.Timestamp("2026-01-01")
@@ -130,21 +280,10 @@ def sidebar_filters(fact: pd.DataFrame, base: Dict[str, object]) -> Dict[str, ob
         max_value=max_month.date(),
     )
 
-    dept_reporting = set(
-        d for d in fact.get("department_reporting", pd.Series(dtype=str)).dropna().unique() if d != ""
-    )
-    dept_quote = set(
-        d for d in fact.get("department_quote", pd.Series(dtype=str)).dropna().unique() if d != ""
-    )
-    department_options = sorted(dept_reporting.union(dept_quote))
-    client_options = sorted({c for c in fact.get("client", pd.Series(dtype=str)).dropna().unique() if c != ""})
-    category_options = sorted({c for c in fact.get("category", pd.Series(dtype=str)).dropna().unique() if c != ""})
-    job_options = sorted({j for j in fact["job_no"].dropna().unique() if j != ""})
-
-    departments = st.sidebar.multiselect("Department", department_options)
-    clients = st.sidebar.multiselect("Client", client_options)
-    categories = st.sidebar.multiselect("Category", category_options)
-    jobs = st.sidebar.multiselect("Job No", job_options)
+    departments = st.sidebar.multiselect("Department", options["departments"])
+    clients = st.sidebar.multiselect("Client", options["clients"])
+    categories = st.sidebar.multiselect("Category", options["categories"])
+    jobs = st.sidebar.multiselect("Job No", options["jobs"])
 
     use_quote_department = st.sidebar.checkbox("Use Quote Department instead", value=False)
     show_only_mismatch = st.sidebar.checkbox("Show only dept mismatches", value=False)
@@ -169,29 +308,113 @@ def sidebar_filters(fact: pd.DataFrame, base: Dict[str, object]) -> Dict[str, ob
     }
 
 
+def month_mask(month_key: pd.Series, start_date: pd.Timestamp, end_date: pd.Timestamp) -> np.ndarray:
+    """Return a boolean mask of rows in the month range, keeping rows with no month."""
+    if isinstance(month_key.dtype, pd.CategoricalDtype):
+        months = month_key.cat.categories
+        keep = np.append((months >= start_date) & (months <= end_date), True)
+        return keep[month_key.cat.codes.to_numpy()]
+    months = month_values(month_key).to_numpy()
+    return np.isnat(months) | ((months >= start_date.to_datetime64()) & (months <= end_date.to_datetime64()))
+
+
+@st.cache_resource(show_spinner=False, max_entries=8, hash_funcs={pd.DataFrame: frame_cache_key})
 def apply_filters(fact: pd.DataFrame, filters: Dict[str, object]) -> pd.DataFrame:
     """Apply filters to fact table."""
-    filtered = fact.copy()
-    month_series = pd.to_datetime(filtered["month_key"], errors="coerce")
-    month_mask = month_series.isna() | (
-        (month_series >= filters["start_date"]) & (month_series <= filters["end_date"])
-    )
-    filtered = filtered[month_mask]
+    mask = month_mask(fact["month_key"], filters["start_date"], filters["end_date"])
 
     department_col = "department_quote" if filters.get("use_quote_department") else "department_reporting"
-    if filters["departments"] and department_col in filtered.columns:
-        filtered = filtered[filtered[department_col].isin(filters["departments"])]
+    if filters["departments"] and department_col in fact.columns:
+        mask &= fact[department_col].isin(filters["departments"]).to_numpy()
     if filters["clients"]:
-        filtered = filtered[filtered["client"].isin(filters["clients"])]
+        mask &= fact["client"].isin(filters["clients"]).to_numpy()
     if filters["categories"]:
-        filtered = filtered[filtered["category"].isin(filters["categories"])]
+        mask &= fact["category"].isin(filters["categories"]).to_numpy()
     if filters["jobs"]:
-        filtered = filtered[filtered["job_no"].isin(filters["jobs"])]
+        mask &= fact["job_no"].isin(filters["jobs"]).to_numpy()
     if filters["billable_only"]:
-        filtered = filtered[filtered["billable_hours"] > 0]
+        mask &= fact["billable_hours"].to_numpy() > 0
     if filters["onshore_only"]:
-        filtered = filtered[filtered["onshore_hours"] > 0]
-    if filters.get("show_only_mismatch") and "dept_match_status" in filtered.columns:
-        filtered = filtered[filtered["dept_match_status"] == "MISMATCH"]
+        mask &= fact["onshore_hours"].to_numpy() > 0
+    if filters.get("show_only_mismatch") and "dept_match_status" in fact.columns:
+        mask &= (fact["dept_match_status"] == "MISMATCH").to_numpy()
+
+    if mask.all():
+        return fact
+    return fact.iloc[np.flatnonzero(mask)]
+
 
-    return filtered
+ROW_LEVEL_FILTERS = ("departments", "clients", "categories", "billable_only", "onshore_only", "show_only_mismatch")
+
+
+def apply_job_month_filters(job_month: pd.DataFrame, filters: Dict[str, object]) -> Optional[pd.DataFrame]:
+    """Apply month and job filters to the job-month summary, or None if row-level filters are active."""
+    if any(filters.get(key) for key in ROW_LEVEL_FILTERS):
+        return None
+    mask = month_mask(job_month["month_key"], filters["start_date"], filters["end_date"])
+    if filters["jobs"]:
+        mask &= job_month["job_no"].isin(filters["jobs"]).to_numpy()
+    return job_month[mask]
+
+
+@st.cache_resource(show_spinner=False, max_entries=8, hash_funcs={pd.DataFrame: frame_cache_key})
+def compute_overview_metrics(
+    fact: pd.DataFrame,
+    filters: Dict[str, object],
+    job_month_summary: Optional[pd.DataFrame] = None,
+) -> Dict[str, object]:
+    """Aggregate Overview page metrics for the filtered fact table."""
+    filtered = apply_filters(fact, filters)
+    by_job = (
+        pd.DataFrame(
+            {
+                "job_no": filtered["job_no"],
+                "revenue": filtered["revenue_allocated"],
+                "cost": filtered["total_cost"],
+                "gp": filtered["gross_profit"],
+                "unquoted_hours": filtered["total_hours"].where(filtered["is_unquoted_task"], 0),
+                "unquoted_rows": filtered["is_unquoted_task"].astype(int),
+            }
+        )
+        .groupby("job_no", dropna=False, observed=True, sort=False)
+        .sum()
+    )
+    totals = by_job.sum()
+    unallocated_rows = np.flatnonzero(filtered["is_unallocated_row"].to_numpy())
+
+    job_month = None if job_month_summary is None else apply_job_month_filters(job_month_summary, filters)
+    if job_month is not None:
+        monthly = (
+            job_month.groupby("month_key", dropna=False, sort=False)
+            .agg(revenue=("revenue_allocated", "sum"), cost=("cost_month", "sum"))
+            .reset_index()
+        )
+    else:
+        monthly = (
+            filtered.groupby("month_key", dropna=False, observed=True, sort=False)
+            .agg(revenue=("revenue_allocated", "sum"), cost=("total_cost", "sum"))
+            .reset_index()
+        )
+    by_task = (
+        filtered.groupby(["job_no", "task_name"], dropna=False, observed=True, sort=False)["quote_hour_variance"]
+        .sum()
+        .reset_index()
+    )
+    job_gp = by_job[["gp"]].reset_index().sort_values("gp", ascending=False)
+    unquoted = (
+        by_job.loc[by_job["unquoted_rows"] > 0, ["unquoted_hours"]]
+        .reset_index()
+        .sort_values("unquoted_hours", ascending=False)
+    )
+
+    return {
+        "revenue": totals["revenue"],
+        "cost": totals["cost"],
+        "unallocated": filtered["revenue_allocated"].to_numpy()[unallocated_rows].sum(),
+        "jobs": int(by_job.index.notna().sum()),
+        "tasks": int(by_task["task_name"].nunique()),
+        "monthly": monthly,
+        "job_gp": job_gp,
+        "unquoted": unquoted,
+        "overruns": by_task.nlargest(15, "quote_hour_variance"),
+    }
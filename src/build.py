@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Optional, Tuple
@@ -10,6 +12,7 @@ from src import allocation, io, metrics, qa, quotation, revenue, timesheet
 from src.utils import (
     apply_department_map,
     get_logger,
+    keys_in,
     load_settings,
     read_department_map,
     read_task_name_map,
@@ -17,6 +20,14 @@ from src.utils import (
 )
 
 
+TASK_NAME_MAP_PATH = "config/task_name_map.csv"
+DEFAULT_DEPARTMENT_MAP_PATH = "config/department_map.csv"
+BUILD_KEY_FILE = ".build_key"
+# Bump whenever the pipeline changes what it writes, so outputs built by older
+# code no longer count as current.
+BUILD_VERSION = "2"
+
+
 @dataclass
 class BuildResult:
     revenue_monthly: pd.DataFrame
@@ -29,19 +40,59 @@ class BuildResult:
     qa_report: Dict[str, object]
 
 
+def build_key(
+    input_path: str | Path,
+    fy: str,
+    include_all_history: bool = False,
+    settings_path: str | Path = "config/settings.yaml",
+) -> str:
+    """Fingerprint the build: pipeline version, workbook stat, options and config file contents."""
+    settings = load_settings(settings_path)
+    stat = Path(input_path).stat()
+    digest = hashlib.sha256(
+        f"{BUILD_VERSION}|{Path(input_path).resolve()}|{stat.st_mtime_ns}|{stat.st_size}|"
+        f"{fy}|{include_all_history}".encode()
+    )
+    config_paths = [
+        settings_path,
+        TASK_NAME_MAP_PATH,
+        settings.get("department_map_path", DEFAULT_DEPARTMENT_MAP_PATH),
+    ]
+    for path in map(Path, config_paths):
+        digest.update(path.read_bytes() if path.exists() else b"")
+    return digest.hexdigest()
+
+
+def build_is_current(
+    input_path: str | Path,
+    fy: str,
+    include_all_history: bool = False,
+    settings_path: str | Path = "config/settings.yaml",
+) -> bool:
+    """Return True if the processed outputs were built from the same inputs."""
+    settings = load_settings(settings_path)
+    key_path = Path(settings["processed_dir"]) / BUILD_KEY_FILE
+    if not key_path.exists() or not Path(input_path).exists():
+        return False
+    return key_path.read_text(encoding="utf-8").strip() == build_key(
+        input_path, fy, include_all_history, settings_path
+    )
+
+
 def build_dataset(
     input_path: str | Path,
     fy: str,
     include_all_history: bool = False,
     settings_path: str | Path = "config/settings.yaml",
+    write_csv: bool = False,
 ) -> BuildResult:
     """Run the end-to-end dataset build."""
     logger = get_logger()
     settings = load_settings(settings_path)
 
     sheets = io.read_excel_sheets(input_path)
-    task_map = read_task_name_map("config/task_name_map.csv")
-    department_map = read_department_map(settings.get("department_map_path", "config/department_map.csv"))
+    task_map = read_task_name_map(TASK_NAME_MAP_PATH)
+    department_map = read_department_map(settings.get("department_map_path", DEFAULT_DEPARTMENT_MAP_PATH))
 
     revenue_monthly, revenue_qa = revenue.aggregate_revenue(
         sheets[io.SHEET_REVENUE], settings["exclusions"]["truthy_values"]
@@ -77,15 +128,10 @@ def build_dataset(
         settings["allocation"]["unallocated_task_name"],
     )
 
-    allocated_keys = allocated[["job_no", "task_name"]].drop_duplicates()
     quote_keys = quote_task[["job_no", "task_name"]].drop_duplicates()
-    missing_quote_tasks = quote_keys.merge(
-        allocated_keys, on=["job_no", "task_name"], how="left", indicator=True
-    )
-    missing_quote_tasks = missing_quote_tasks[missing_quote_tasks["_merge"].ne("both")].drop(columns=["_merge"])
+    missing_quote_tasks = quote_keys[~keys_in(quote_keys, allocated, ["job_no", "task_name"])]
     if not missing_quote_tasks.empty:
         synth = missing_quote_tasks.copy()
-        synth["month_key"] = pd.NaT
         synth["task_name_raw"] = synth["task_name"]
         synth["total_hours"] = 0.0
         synth["billable_hours"] = 0.0
@@ -99,14 +145,13 @@ def build_dataset(
         synth["revenue_allocated"] = 0.0
         synth["is_unallocated_row"] = False
         synth["is_quote_only_task"] = True
-        for col in allocated.columns:
-            if col not in synth.columns:
-                synth[col] = None
-        allocated = pd.concat([allocated, synth[allocated.columns]], ignore_index=True)
+        # Columns not set here, month_key included, are filled by the concat with
+        # missing values of the allocated dtype.
+        synth = synth[synth.columns.intersection(allocated.columns)]
+        allocated = pd.concat([allocated, synth], ignore_index=True)
 
     fact = metrics.build_fact_table(allocated, quote_task)
-    job_month_summary = metrics.build_job_month_summary(fact)
-    job_total_summary = metrics.build_job_total_summary(fact)
+    job_month_summary, job_total_summary = metrics.build_job_summaries(fact)
     quote_vs_actual_summary = metrics.build_quote_vs_actual_summary(fact)
 
     qa_report = qa.build_qa_report(
@@ -119,22 +164,25 @@ def build_dataset(
 
     processed_dir = Path(settings["processed_dir"])
     processed_dir.mkdir(parents=True, exist_ok=True)
-
-    io.save_parquet(revenue_monthly, processed_dir / "revenue_monthly.parquet")
-    io.save_parquet(timesheet_task_month, processed_dir / "timesheet_task_month.parquet")
-    io.save_parquet(quote_task, processed_dir / "quote_task.parquet")
-    io.save_parquet(fact, processed_dir / "fact_job_task_month.parquet")
-    io.save_parquet(job_month_summary, processed_dir / "job_month_summary.parquet")
-    io.save_parquet(job_total_summary, processed_dir / "job_total_summary.parquet")
-    io.save_parquet(quote_vs_actual_summary, processed_dir / "quote_vs_actual_summary.parquet")
-
-    io.save_csv(revenue_monthly, processed_dir / "revenue_monthly.csv")
-    io.save_csv(timesheet_task_month, processed_dir / "timesheet_task_month.csv")
-    io.save_csv(quote_task, processed_dir / "quote_task.csv")
-    io.save_csv(fact, processed_dir / "fact_job_task_month.csv")
-    io.save_csv(job_month_summary, processed_dir / "job_month_summary.csv")
-    io.save_csv(job_total_summary, processed_dir / "job_total_summary.csv")
-    io.save_csv(quote_vs_actual_summary, processed_dir / "quote_vs_actual_summary.csv")
+    # The outputs stop counting as current until every write and check below succeeds.
+    (processed_dir / BUILD_KEY_FILE).unlink(missing_ok=True)
+
+    outputs = {
+        "revenue_monthly": revenue_monthly,
+        "timesheet_task_month": timesheet_task_month,
+        "quote_task": quote_task,
+        "fact_job_task_month": fact,
+        "job_month_summary": job_month_summary,
+        "job_total_summary": job_total_summary,
+        "quote_vs_actual_summary": quote_vs_actual_summary,
+    }
+    # pyarrow releases the GIL while encoding, so the parquet writes overlap on threads.
+    parquet_paths = [processed_dir / f"{name}.parquet" for name in outputs]
+    with ThreadPoolExecutor(max_workers=len(outputs)) as executor:
+        list(executor.map(io.save_parquet, outputs.values(), parquet_paths))
+    if write_csv:
+        for name, df in outputs.items():
+            io.save_csv(df, processed_dir / f"{name}.csv")
 
     write_json(processed_dir / "qa_report.json", qa_report)
 
@@ -143,6 +191,9 @@ def build_dataset(
     if not qa_report.get("unique_keys_ok", True):
         raise ValueError("Fact table key uniqueness check failed.")
 
+    (processed_dir / BUILD_KEY_FILE).write_text(
+        build_key(input_path, fy, include_all_history, settings_path), encoding="utf-8"
+    )
     logger.info("Build completed for %s", fy)
 
     return BuildResult(
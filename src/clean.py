@@ -4,13 +4,13 @@ from typing import Dict
 
 import pandas as pd
 
-from src.utils import standardize_job_no, standardize_task_name, to_month_start
+from src.utils import standardize_job_no, standardize_task_name, standardize_values, to_month_start
 
 
 def add_revenue_keys(df: pd.DataFrame) -> pd.DataFrame:
     """Standardize revenue keys and month column."""
     df = df.copy()
-    df["job_no"] = df["Job Number"].apply(standardize_job_no)
+    df["job_no"] = standardize_values(df["Job Number"], standardize_job_no)
     df["month_key"] = to_month_start(df["Month"])
     return df
 
@@ -18,9 +18,9 @@ def add_revenue_keys(df: pd.DataFrame) -> pd.DataFrame:
 def add_timesheet_keys(df: pd.DataFrame) -> pd.DataFrame:
     """Standardize timesheet keys and month column."""
     df = df.copy()
-    df["job_no"] = df["[Job] Job No."].apply(standardize_job_no)
-    df["task_name_raw"] = df["[Job Task] Name"].apply(standardize_task_name)
-    df["task_name"] = df["task_name_raw"].apply(standardize_task_name)
+    df["job_no"] = standardize_values(df["[Job] Job No."], standardize_job_no)
+    df["task_name_raw"] = standardize_values(df["[Job Task] Name"], standardize_task_name)
+    df["task_name"] = df["task_name_raw"]
     df["month_key"] = to_month_start(df["Month Key"])
     return df
 
@@ -28,9 +28,9 @@ def add_timesheet_keys(df: pd.DataFrame) -> pd.DataFrame:
 def add_quotation_keys(df: pd.DataFrame) -> pd.DataFrame:
     """Standardize quotation keys."""
     df = df.copy()
-    df["job_no"] = df["[Job] Job No."].apply(standardize_job_no)
-    df["task_name_raw"] = df["[Job Task] Name"].apply(standardize_task_name)
-    df["task_name"] = df["task_name_raw"].apply(standardize_task_name)
+    df["job_no"] = standardize_values(df["[Job] Job No."], standardize_job_no)
+    df["task_name_raw"] = standardize_values(df["[Job Task] Name"], standardize_task_name)
+    df["task_name"] = df["task_name_raw"]
     return df
 
 
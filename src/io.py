@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import importlib.util
 from pathlib import Path
 from typing import Dict
 
@@ -13,6 +14,14 @@ SHEET_TIMESHEET = "Timesheet Data"
 SHEET_QUOTATION = "Quotation Data"
 
 
+def _excel_engine() -> str:
+    """Prefer the calamine reader when python-calamine is installed and pandas supports it (2.2+)."""
+    pandas_version = tuple(int(part) for part in pd.__version__.split(".")[:2])
+    if pandas_version >= (2, 2) and importlib.util.find_spec("python_calamine"):
+        return "calamine"
+    return "openpyxl"
+
+
 def read_excel_sheets(path: str | Path) -> Dict[str, pd.DataFrame]:
     """Read required sheets from the Excel file."""
     logger = get_logger()
@@ -20,11 +29,12 @@ def read_excel_sheets(path: str | Path) -> Dict[str, pd.DataFrame]:
     if not excel_path.exists():
         raise FileNotFoundError(f"Excel file not found: {excel_path}")
 
-    logger.info("Loading Excel: %s", excel_path)
+    engine = _excel_engine()
+    logger.info("Loading Excel: %s (%s)", excel_path, engine)
     sheets = pd.read_excel(
         excel_path,
         sheet_name=[SHEET_REVENUE, SHEET_TIMESHEET, SHEET_QUOTATION],
-        engine="openpyxl",
+        engine=engine,
     )
     return {name: normalize_columns(df) for name, df in sheets.items()}
 
@@ -32,7 +42,7 @@ def read_excel_sheets(path: str | Path) -> Dict[str, pd.DataFrame]:
 def save_parquet(df: pd.DataFrame, path: str | Path) -> None:
     """Save dataframe to parquet."""
     Path(path).parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(path, index=False)
+    df.to_parquet(path, index=False, compression="zstd")
 
 
 def save_csv(df: pd.DataFrame, path: str | Path) -> None:
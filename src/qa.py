@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from typing import Dict, Tuple
 
+import numpy as np
 import pandas as pd
 
-from src.utils import ensure_unique, fuzzy_task_suggestions, get_logger
+from src.utils import ensure_unique, fuzzy_task_suggestions, get_logger, keys_in, safe_divide
 
 
 def build_qa_report(
@@ -17,16 +18,21 @@ def build_qa_report(
     """Generate QA checks and summary metrics."""
     logger = get_logger()
 
-    allocation_check = (
-        fact.groupby(["job_no", "month_key"], dropna=False)
-        .agg(revenue_monthly=("revenue_monthly", "first"), revenue_allocated=("revenue_allocated", "sum"))
-        .reset_index()
+    # Hash the job and month keys once; the codes serve every fact-wide grouping below.
+    job_codes, _ = pd.factorize(fact["job_no"], use_na_sentinel=False)
+    month_codes, months = pd.factorize(fact["month_key"], sort=True, use_na_sentinel=False)
+
+    allocation_check = fact.groupby([job_codes, month_codes], sort=False).agg(
+        revenue_monthly=("revenue_monthly", "first"), revenue_allocated=("revenue_allocated", "sum")
+    )
+    abs_delta = np.abs(
+        allocation_check["revenue_monthly"].to_numpy(dtype=np.float64)
+        - allocation_check["revenue_allocated"].to_numpy(dtype=np.float64)
     )
-    allocation_check["delta"] = allocation_check["revenue_monthly"] - allocation_check["revenue_allocated"]
-    allocation_check["within_tolerance"] = allocation_check["delta"].abs() <= tolerance
 
-    allocation_ok = bool(allocation_check["within_tolerance"].all())
-    max_delta = float(allocation_check["delta"].abs().max()) if not allocation_check.empty else 0.0
+    allocation_ok = bool((abs_delta <= tolerance).all())
+    # fmax skips NaN deltas, as Series.max did.
+    max_delta = float(np.fmax.reduce(abs_delta)) if abs_delta.size else 0.0
 
     unique_keys_ok = ensure_unique(fact, ["job_no", "task_name", "month_key"])
 
@@ -40,8 +46,7 @@ def build_qa_report(
 
     timesheet_tasks = timesheet_task_month[["job_no", "task_name"]].drop_duplicates()
     quote_tasks = quote_task[["job_no", "task_name"]].drop_duplicates()
-    unmatched_timesheet = timesheet_tasks.merge(quote_tasks, on=["job_no", "task_name"], how="left", indicator=True)
-    unmatched_timesheet = unmatched_timesheet[unmatched_timesheet["_merge"].ne("both")]
+    unmatched_timesheet = timesheet_tasks[~keys_in(timesheet_tasks, quote_tasks, ["job_no", "task_name"])]
 
     suggestions = fuzzy_task_suggestions(
         unmatched_timesheet["task_name"].tolist(), quote_tasks["task_name"].tolist()
@@ -53,53 +58,52 @@ def build_qa_report(
     mismatch_revenue_by_month = []
     mixed_department_share = 0.0
     if "dept_match_status" in fact.columns:
-        mismatch = fact[fact["dept_match_status"] == "MISMATCH"].copy()
+        is_mismatch = fact["dept_match_status"].eq("MISMATCH").to_numpy()
+        mismatch = fact[is_mismatch]
         if not mismatch.empty:
             mismatch_counts = (
                 mismatch.groupby(["department_actual", "department_quote"], dropna=False)
                 .size()
                 .reset_index(name="count")
-                .sort_values("count", ascending=False)
-                .head(20)
+                .nlargest(20, "count")
                 .to_dict(orient="records")
             )
-            top_mismatch_by_hours = (
+            mismatch_by_task = (
                 mismatch.groupby(["job_no", "task_name"], dropna=False)
-                .agg(total_hours=("total_hours", "sum"))
+                .agg(total_hours=("total_hours", "sum"), revenue_allocated=("revenue_allocated", "sum"))
                 .reset_index()
-                .sort_values("total_hours", ascending=False)
-                .head(20)
+            )
+            top_mismatch_by_hours = (
+                mismatch_by_task[["job_no", "task_name", "total_hours"]]
+                .nlargest(20, "total_hours")
                 .to_dict(orient="records")
             )
             top_mismatch_by_revenue = (
-                mismatch.groupby(["job_no", "task_name"], dropna=False)
-                .agg(revenue_allocated=("revenue_allocated", "sum"))
-                .reset_index()
-                .sort_values("revenue_allocated", ascending=False)
-                .head(20)
+                mismatch_by_task[["job_no", "task_name", "revenue_allocated"]]
+                .nlargest(20, "revenue_allocated")
                 .to_dict(orient="records")
             )
-            mismatch_month = (
-                mismatch.groupby("month_key", dropna=False)["revenue_allocated"]
-                .sum()
-                .reset_index()
-                .rename(columns={"revenue_allocated": "mismatch_revenue"})
+            revenue = fact["revenue_allocated"].fillna(0).to_numpy(dtype=np.float64)
+            mismatch_rows = np.bincount(month_codes[is_mismatch], minlength=len(months))
+            mismatch_revenue = np.bincount(
+                month_codes[is_mismatch], weights=revenue[is_mismatch], minlength=len(months)
             )
-            total_month = (
-                fact.groupby("month_key", dropna=False)["revenue_allocated"]
-                .sum()
-                .reset_index()
-                .rename(columns={"revenue_allocated": "total_revenue"})
+            total_revenue = np.bincount(month_codes, weights=revenue, minlength=len(months))
+            has_mismatch = mismatch_rows > 0
+            mismatch_month = pd.DataFrame(
+                {
+                    "month_key": months[has_mismatch],
+                    "mismatch_revenue": mismatch_revenue[has_mismatch],
+                    "total_revenue": total_revenue[has_mismatch],
+                }
             )
-            mismatch_month = mismatch_month.merge(total_month, on="month_key", how="left")
-            mismatch_month["mismatch_revenue_share"] = mismatch_month.apply(
-                lambda r: float(r["mismatch_revenue"] / r["total_revenue"]) if r["total_revenue"] else 0.0,
-                axis=1,
+            mismatch_month["mismatch_revenue_share"] = safe_divide(
+                mismatch_month["mismatch_revenue"], mismatch_month["total_revenue"]
             )
             mismatch_revenue_by_month = mismatch_month.to_dict(orient="records")
         if "mixed_department" in fact.columns:
             total_hours = fact["total_hours"].sum()
-            mixed_hours = fact.loc[fact["mixed_department"], "total_hours"].sum()
+            mixed_hours = fact.loc[fact["mixed_department"].eq(True), "total_hours"].sum()
             mixed_department_share = float(mixed_hours / total_hours) if total_hours else 0.0
 
     report = {
@@ -5,7 +5,7 @@ from typing import Dict, Tuple
 import pandas as pd
 
 from src.clean import add_quotation_keys
-from src.utils import get_logger, safe_to_numeric, standardize_department
+from src.utils import get_logger, group_modes, safe_to_numeric, standardize_department, standardize_values
 
 
 META_COLUMNS = {
@@ -20,13 +20,6 @@ META_COLUMNS = {
 }
 
 
-def _mode(series: pd.Series) -> str:
-    series = series.dropna()
-    if series.empty:
-        return ""
-    return str(series.mode().iloc[0])
-
-
 def aggregate_quotation(df: pd.DataFrame, map_df: pd.DataFrame | None = None) -> Tuple[pd.DataFrame, Dict[str, int]]:
     """Aggregate quotation rows to job-task level."""
     logger = get_logger()
@@ -41,34 +34,22 @@ def aggregate_quotation(df: pd.DataFrame, map_df: pd.DataFrame | None = None) ->
     df["invoiced_time"] = safe_to_numeric(df.get("[Job Task] Invoiced Time", pd.Series(dtype=float))).fillna(0)
     df["invoiced_amount"] = safe_to_numeric(df.get("[Job Task] Invoiced Amount", pd.Series(dtype=float))).fillna(0)
 
-    df["department_quote"] = df.get("Department", pd.Series(dtype=str)).apply(standardize_department)
+    df["department_quote"] = standardize_values(df.get("Department", pd.Series(dtype=str)), standardize_department)
 
     agg_map = {
-        "quoted_time": "sum",
-        "quoted_amount": "sum",
-        "invoiced_time": "sum",
-        "invoiced_amount": "sum",
-        "task_name_raw": _mode,
+        "quoted_time": ("quoted_time", "sum"),
+        "quoted_amount": ("quoted_amount", "sum"),
+        "invoiced_time": ("invoiced_time", "sum"),
+        "invoiced_amount": ("invoiced_amount", "sum"),
     }
-
-    for out_col, src_col in META_COLUMNS.items():
-        if src_col in df.columns:
-            agg_map[src_col] = _mode
-
-    grouped = (
-        df.groupby(["job_no", "task_name"], dropna=False)
-        .agg(agg_map)
-        .reset_index()
-    )
-
-    quote_dept_counts = (
-        df.groupby(["job_no", "task_name"], dropna=False)["department_quote"]
-        .nunique()
-        .reset_index()
-        .rename(columns={"department_quote": "quote_mixed_department"})
-    )
-    quote_dept_counts["quote_mixed_department"] = quote_dept_counts["quote_mixed_department"] > 1
-    grouped = grouped.merge(quote_dept_counts, on=["job_no", "task_name"], how="left")
+    mode_cols = ["task_name_raw"] + [src_col for src_col in META_COLUMNS.values() if src_col in df.columns]
+
+    task_groups = df.groupby(["job_no", "task_name"], dropna=False, observed=True, sort=False)
+    grouped = task_groups.agg(**agg_map).reset_index()
+    group_codes = task_groups.ngroup().to_numpy()
+    for src_col in mode_cols:
+        grouped[src_col] = group_modes(df[src_col], group_codes, len(grouped))
+    grouped["quote_mixed_department"] = task_groups["department_quote"].nunique().to_numpy() > 1
 
     rename_map = {v: k for k, v in META_COLUMNS.items() if v in grouped.columns}
     grouped = grouped.rename(columns=rename_map)
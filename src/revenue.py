@@ -5,14 +5,14 @@ from typing import Dict, Tuple
 import pandas as pd
 
 from src.clean import add_revenue_keys
-from src.utils import get_logger, truthy_flag
+from src.utils import get_logger, group_modes, truthy_mask
 
 
 def aggregate_revenue(df: pd.DataFrame, truthy_values: list) -> Tuple[pd.DataFrame, Dict[str, int]]:
     """Aggregate revenue to job-month with filtering for exclusions."""
     logger = get_logger()
     df = add_revenue_keys(df)
-    df["is_excluded"] = df["Excluded"].apply(lambda v: truthy_flag(v, truthy_values))
+    df["is_excluded"] = truthy_mask(df["Excluded"], truthy_values)
 
     excluded_count = int(df["is_excluded"].sum())
     filtered = df[~df["is_excluded"]].copy()
@@ -29,20 +29,12 @@ def aggregate_revenue(df: pd.DataFrame, truthy_values: list) -> Tuple[pd.DataFra
         "FY",
     ]
 
-    def _mode(series: pd.Series) -> str:
-        series = series.dropna()
-        if series.empty:
-            return ""
-        return str(series.mode().iloc[0])
-
-    meta_agg = {col: _mode for col in meta_cols if col in filtered.columns}
-
-    revenue_monthly = (
-        filtered.groupby(["job_no", "month_key"], dropna=False)
-        .agg({"Amount": "sum", **meta_agg})
-        .reset_index()
-        .rename(columns={"Amount": "revenue_monthly"})
-    )
+    job_months = filtered.groupby(["job_no", "month_key"], dropna=False, observed=True, sort=False)
+    revenue_monthly = job_months.agg(revenue_monthly=("Amount", "sum")).reset_index()
+    group_codes = job_months.ngroup().to_numpy()
+    for col in meta_cols:
+        if col in filtered.columns:
+            revenue_monthly[col] = group_modes(filtered[col], group_codes, len(revenue_monthly))
 
     qa = {"excluded_rows": excluded_count}
     return revenue_monthly, qa
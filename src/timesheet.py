@@ -6,7 +6,14 @@ import numpy as np
 import pandas as pd
 
 from src.clean import add_timesheet_keys
-from src.utils import get_logger, safe_to_numeric, standardize_department
+from src.utils import (
+    get_logger,
+    group_modes,
+    safe_divide,
+    safe_to_numeric,
+    standardize_department,
+    standardize_values,
+)
 
 
 DIMENSION_COLUMNS = {
@@ -18,43 +25,65 @@ DIMENSION_COLUMNS = {
 }
 
 
-def _mode(series: pd.Series) -> str:
-    series = series.dropna()
-    if series.empty:
-        return ""
-    return str(series.mode().iloc[0])
-
-
 def _mixed(series: pd.Series) -> bool:
     return series.dropna().nunique() > 1
 
 
-def _weighted_mode_info(values: pd.Series, weights: pd.Series) -> Tuple[str, bool, float, str, float]:
-    data = pd.DataFrame({"value": values, "weight": weights})
-    data = data.dropna(subset=["value"])
-    data = data[data["value"].astype(str).str.strip() != ""]
-    if data.empty:
-        return "", False, 0.0, "", 0.0
-    summary = data.groupby("value", dropna=False)["weight"].sum().reset_index()
-    summary = summary[summary["weight"] > 0].sort_values("weight", ascending=False)
-    if summary.empty:
-        return "", False, 0.0, "", 0.0
-    total = summary["weight"].sum()
-    top_value = str(summary.iloc[0]["value"])
-    top_weight = float(summary.iloc[0]["weight"])
-    mixed = len(summary) > 1
-    second_value = ""
-    second_share = 0.0
-    if mixed:
-        second_value = str(summary.iloc[1]["value"])
-        second_share = float(summary.iloc[1]["weight"]) / total if total else 0.0
-    top_share = top_weight / total if total else 0.0
-    return top_value, mixed, top_share, second_value, second_share
-
-
-def _weighted_mode(values: pd.Series, weights: pd.Series) -> Tuple[str, bool]:
-    top_value, mixed, _, _, _ = _weighted_mode_info(values, weights)
-    return top_value, mixed
+def _weighted_modes(values: pd.Series, weights: pd.Series, group_codes: np.ndarray, n_groups: int) -> pd.DataFrame:
+    """Hours-weighted top and runner-up value for every group in one pass."""
+    codes, uniques = pd.factorize(values, sort=True)
+    n_values = max(len(uniques), 1)
+    non_blank = np.array([str(value).strip() != "" for value in uniques] + [False], dtype=bool)
+    rows = np.flatnonzero(non_blank[codes])
+    pair = group_codes[rows].astype(np.int64) * n_values + codes[rows]
+    pair_weight = pd.Series(np.asarray(weights, dtype=float)[rows]).groupby(pair).sum()
+    pair_weight = pair_weight[pair_weight > 0]
+    pair_group = pair_weight.index.to_numpy() // n_values
+    pair_value = pair_weight.index.to_numpy() % n_values
+    weight = pair_weight.to_numpy()
+    order = np.lexsort((pair_value, -weight, pair_group))
+    pair_group, pair_value, weight = pair_group[order], pair_value[order], weight[order]
+
+    starts = np.flatnonzero(np.r_[True, pair_group[1:] != pair_group[:-1]]) if len(order) else order
+    counts = np.diff(np.r_[starts, len(order)])
+    second = np.where(counts > 1, starts + 1, starts)
+    groups = pair_group[starts]
+    total = weight[starts].copy()
+    for offset in range(1, counts.max(initial=1)):
+        more = counts > offset
+        total[more] += weight[starts[more] + offset]
+
+    # Groups holding only numbers report them as floats, e.g. "0.0".
+    numeric = np.array(
+        [isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)) for value in uniques]
+        + [False],
+        dtype=bool,
+    )
+    text_group = np.bincount(group_codes[rows[~numeric[codes[rows]]]], minlength=n_groups) > 0
+    label = np.array([str(value) for value in uniques], dtype=object)
+    float_label = np.array(
+        [str(float(value)) if is_numeric else str(value) for value, is_numeric in zip(uniques, numeric[:-1])],
+        dtype=object,
+    )
+    as_text = text_group[groups]
+
+    result = pd.DataFrame(
+        {
+            "value": np.full(n_groups, "", dtype=object),
+            "mixed": np.zeros(n_groups, dtype=bool),
+            "top_share": np.zeros(n_groups),
+            "second": np.full(n_groups, "", dtype=object),
+            "second_share": np.zeros(n_groups),
+        }
+    )
+    top_code, second_code = pair_value[starts], pair_value[second]
+    result.loc[groups, "value"] = np.where(as_text, label[top_code], float_label[top_code])
+    result.loc[groups, "mixed"] = counts > 1
+    result.loc[groups, "top_share"] = weight[starts] / total
+    second_label = np.where(as_text, label[second_code], float_label[second_code])
+    result.loc[groups, "second"] = np.where(counts > 1, second_label, "")
+    result.loc[groups, "second_share"] = np.where(counts > 1, weight[second] / total, 0.0)
+    return result
 
 
 def aggregate_timesheet(df: pd.DataFrame, map_df: pd.DataFrame | None = None) -> Tuple[pd.DataFrame, Dict[str, int]]:
@@ -79,18 +108,26 @@ def aggregate_timesheet(df: pd.DataFrame, map_df: pd.DataFrame | None = None) ->
 
     df["billable_flag"] = df["Billable?"].astype(str).str.upper().str.strip().eq("YES")
     df["onshore_flag"] = df["Onshore"].astype(str).str.strip().isin(["1", "TRUE", "YES"])
-    df["department_actual"] = df.get("Department", pd.Series(dtype=str)).apply(standardize_department)
+    df["department_actual"] = standardize_values(df.get("Department", pd.Series(dtype=str)), standardize_department)
 
     df["cost"] = df["hours"] * df["base_rate"]
     df["billable_amount_actual"] = df["hours"] * df["billable_rate"]
+    df["billable_hours"] = df["hours"].where(df["billable_flag"], 0.0)
+    df["onshore_hours"] = df["hours"].where(df["onshore_flag"], 0.0)
+    df["base_rate_hours"] = df["hours"].where(df["base_rate"] > 0, 0.0)
+    df["billable_rate_hours"] = df["hours"].where(df["billable_rate"] > 0, 0.0)
 
     agg_map = {
         "hours": "sum",
         "cost": "sum",
         "billable_amount_actual": "sum",
-        "billable_flag": "sum",
-        "onshore_flag": "sum",
-        "[Staff] Name": pd.Series.nunique,
+        "billable_hours": "sum",
+        "onshore_hours": "sum",
+        "[Staff] Name": "nunique",
+        "missing_base_rate": "max",
+        "had_negative_hours": "max",
+        "base_rate_hours": "sum",
+        "billable_rate_hours": "sum",
     }
 
     grouped = df.groupby(["job_no", "task_name", "month_key"], dropna=False)
@@ -99,47 +136,36 @@ def aggregate_timesheet(df: pd.DataFrame, map_df: pd.DataFrame | None = None) ->
         columns={
             "hours": "total_hours",
             "cost": "total_cost",
-            "billable_amount_actual": "billable_amount_actual",
-            "billable_flag": "billable_hours",
-            "onshore_flag": "onshore_hours",
             "[Staff] Name": "distinct_staff_count",
+            "missing_base_rate": "missing_base_rate_flag",
+            "had_negative_hours": "had_negative_hours_flag",
         }
     )
-    numeric["billable_hours"] = grouped.apply(lambda g: g.loc[g["billable_flag"], "hours"].sum()).values
-    numeric["onshore_hours"] = grouped.apply(lambda g: g.loc[g["onshore_flag"], "hours"].sum()).values
-    numeric["missing_base_rate_flag"] = grouped.apply(lambda g: g["missing_base_rate"].any()).values
-    numeric["had_negative_hours_flag"] = grouped.apply(lambda g: g["had_negative_hours"].any()).values
-
-    base_rate_hours = grouped.apply(lambda g: g.loc[g["base_rate"] > 0, "hours"].sum()).values
-    billable_rate_hours = grouped.apply(lambda g: g.loc[g["billable_rate"] > 0, "hours"].sum()).values
-    numeric["avg_base_rate"] = np.where(
-        base_rate_hours > 0, numeric["total_cost"] / base_rate_hours, 0
-    )
-    numeric["avg_billable_rate"] = np.where(
-        billable_rate_hours > 0, numeric["billable_amount_actual"] / billable_rate_hours, 0
+    numeric["avg_base_rate"] = safe_divide(numeric["total_cost"], numeric["base_rate_hours"], positive_only=True)
+    numeric["avg_billable_rate"] = safe_divide(
+        numeric["billable_amount_actual"], numeric["billable_rate_hours"], positive_only=True
     )
+    numeric = numeric.drop(columns=["base_rate_hours", "billable_rate_hours"])
 
-    dims = {"task_name_raw": grouped["task_name_raw"].agg(_mode).values}
-    dept_info = grouped.apply(lambda g: _weighted_mode_info(g["department_actual"], g["hours"]))
-    dept_df = pd.DataFrame(
-        dept_info.tolist(),
-        columns=[
-            "department_actual",
-            "mixed_department",
-            "dept_top_share",
-            "dept_second",
-            "dept_second_share",
-        ],
+    group_codes = grouped.ngroup().to_numpy()
+    dims = {"task_name_raw": group_modes(df["task_name_raw"], group_codes, len(numeric))}
+    dept_df = _weighted_modes(df["department_actual"], df["hours"], group_codes, len(numeric)).rename(
+        columns={
+            "value": "department_actual",
+            "mixed": "mixed_department",
+            "top_share": "dept_top_share",
+            "second": "dept_second",
+            "second_share": "dept_second_share",
+        }
     )
     dims.update({col: dept_df[col].values for col in dept_df.columns})
 
     for out_col, src_col in DIMENSION_COLUMNS.items():
         if src_col not in df.columns:
             continue
-        mode_info = grouped.apply(lambda g: _weighted_mode(g[src_col], g["hours"]))
-        mode_df = pd.DataFrame(mode_info.tolist(), columns=[out_col, f"mixed_dimension_{out_col}"])
-        dims[out_col] = mode_df[out_col].values
-        dims[f"mixed_dimension_{out_col}"] = mode_df[f"mixed_dimension_{out_col}"].values
+        mode_df = _weighted_modes(df[src_col], df["hours"], group_codes, len(numeric))
+        dims[out_col] = mode_df["value"].values
+        dims[f"mixed_dimension_{out_col}"] = mode_df["mixed"].values
 
     dim_df = pd.DataFrame(dims)
     timesheet_task_month = pd.concat([numeric.reset_index(drop=True), dim_df], axis=1)
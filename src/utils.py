@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 import logging
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -11,18 +11,22 @@ import yaml
 
 
 LOGGER_NAME = "sg_profitability"
+_LOGGER: Optional[logging.Logger] = None
 
 
 def get_logger() -> logging.Logger:
     """Create or return a module-level logger."""
-    logger = logging.getLogger(LOGGER_NAME)
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        logger.setLevel(logging.INFO)
-    return logger
+    global _LOGGER
+    if _LOGGER is None:
+        logger = logging.getLogger(LOGGER_NAME)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        _LOGGER = logger
+    return _LOGGER
 
 
 def load_settings(path: str | Path) -> Dict[str, Any]:
@@ -61,6 +65,36 @@ def standardize_department(value: Any) -> str:
     return normalize_whitespace(value).upper()
 
 
+def standardize_values(values: pd.Series, standardize: Callable[[Any], str]) -> pd.Series:
+    """Apply a scalar standardizer once per distinct value of a Series."""
+    codes, uniques = pd.factorize(values)
+    standardized = np.array([standardize(v) for v in uniques] + [standardize(None)], dtype=object)
+    return pd.Series(standardized[codes], index=values.index, name=values.name)
+
+
+def group_modes(values: pd.Series, group_codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """Most frequent non-null value of every group as a string, "" for empty groups.
+
+    Ties go to the smallest value, as with ``Series.mode().iloc[0]``.
+    """
+    codes, uniques = pd.factorize(values, sort=True)
+    n_values = max(len(uniques), 1)
+    valid = codes >= 0
+    pair, counts = np.unique(
+        np.asarray(group_codes, dtype=np.int64)[valid] * n_values + codes[valid], return_counts=True
+    )
+    pair_group = pair // n_values
+    pair_value = pair % n_values
+    order = np.lexsort((pair_value, -counts, pair_group))
+    pair_group, pair_value = pair_group[order], pair_value[order]
+    starts = np.flatnonzero(np.r_[True, pair_group[1:] != pair_group[:-1]]) if len(order) else order
+
+    label = np.array([str(value) for value in uniques], dtype=object)
+    result = np.full(n_groups, "", dtype=object)
+    result[pair_group[starts]] = label[pair_value[starts]]
+    return result
+
+
 def truthy_flag(value: Any, truthy_values: Iterable[Any]) -> bool:
     """Evaluate whether a value should be treated as truthy by configuration."""
     if value is None or (isinstance(value, float) and np.isnan(value)):
@@ -76,6 +110,17 @@ def truthy_flag(value: Any, truthy_values: Iterable[Any]) -> bool:
     return False
 
 
+def truthy_mask(values: pd.Series, truthy_values: Iterable[Any]) -> pd.Series:
+    """Vectorized truthy_flag over a Series."""
+    truthy_values = list(truthy_values)
+    text_values = {item.strip().upper() for item in truthy_values if isinstance(item, str)}
+    other_values = [item for item in truthy_values if not isinstance(item, str)]
+    mask = values.astype(str).str.strip().str.upper().isin(text_values)
+    if other_values:
+        mask |= values.isin(other_values)
+    return mask & values.notna()
+
+
 def safe_to_numeric(series: pd.Series) -> pd.Series:
     """Convert a Series to numeric values, coercing errors to NaN."""
     return pd.to_numeric(series, errors="coerce")
@@ -87,6 +132,15 @@ def to_month_start(dt_series: pd.Series) -> pd.Series:
     return dates.values.astype("datetime64[M]")
 
 
+def safe_divide(numerator: Any, denominator: Any, positive_only: bool = False) -> np.ndarray:
+    """Divide elementwise, returning 0 where the denominator is zero (or not positive)."""
+    num = np.asarray(numerator, dtype=np.float64)
+    den = np.asarray(denominator, dtype=np.float64)
+    out = np.zeros(np.broadcast(num, den).shape)
+    np.divide(num, den, out=out, where=den > 0 if positive_only else den != 0)
+    return out
+
+
 def weighted_average(values: pd.Series, weights: pd.Series) -> float:
     """Compute weighted average with safe guards."""
     mask = weights > 0
@@ -118,7 +172,7 @@ def apply_department_map(values: pd.Series, map_df: pd.DataFrame) -> pd.Series:
         for _, row in map_df.iterrows()
         if row["from_dept"]
     }
-    return values.apply(lambda v: mapping.get(standardize_department(v), standardize_department(v)))
+    return standardize_values(values, lambda v: mapping.get(standardize_department(v), standardize_department(v)))
 
 
 def apply_task_name_map(
@@ -130,29 +184,25 @@ def apply_task_name_map(
 
     df = df.copy()
     map_df = map_df.copy()
-    map_df["job_no"] = map_df["job_no"].fillna("").apply(standardize_job_no)
-    map_df["from_task"] = map_df["from_task"].apply(standardize_task_name)
-    map_df["to_task"] = map_df["to_task"].apply(standardize_task_name)
-
-    global_map = {
-        row["from_task"]: row["to_task"]
-        for _, row in map_df[map_df["job_no"] == ""].iterrows()
-        if row["from_task"]
-    }
-    job_specific = {}
-    for _, row in map_df[map_df["job_no"] != ""].iterrows():
-        if row["from_task"]:
-            job_specific.setdefault(row["job_no"], {})[row["from_task"]] = row["to_task"]
-
-    def _map(row: pd.Series) -> str:
-        job = row[job_col]
-        task = row[task_col]
-        mapped = job_specific.get(job, {}).get(task)
-        if mapped:
-            return mapped
-        return global_map.get(task, task)
-
-    df[task_col] = df.apply(_map, axis=1)
+    map_df["job_no"] = standardize_values(map_df["job_no"].fillna(""), standardize_job_no)
+    map_df["from_task"] = standardize_values(map_df["from_task"], standardize_task_name)
+    map_df["to_task"] = standardize_values(map_df["to_task"], standardize_task_name)
+
+    map_df = map_df[map_df["from_task"] != ""]
+    global_rows = map_df[map_df["job_no"] == ""]
+    job_rows = map_df[map_df["job_no"] != ""]
+    global_map = dict(zip(global_rows["from_task"], global_rows["to_task"]))
+    job_specific = dict(zip(zip(job_rows["job_no"], job_rows["from_task"]), job_rows["to_task"]))
+    job_specific = {key: to_task for key, to_task in job_specific.items() if to_task}
+
+    tasks = df[task_col]
+    mapped = tasks.map(global_map).where(tasks.isin(list(global_map)), tasks)
+    if job_specific:
+        keys = pd.MultiIndex.from_tuples(list(job_specific))
+        position = keys.get_indexer(pd.MultiIndex.from_arrays([df[job_col], tasks]))
+        to_task = np.array(list(job_specific.values()), dtype=object)
+        mapped = mapped.where(position < 0, to_task[position])
+    df[task_col] = mapped
     return df
 
 
@@ -163,18 +213,33 @@ def write_json(path: str | Path, payload: Dict[str, Any]) -> None:
 
 
 def coalesce(*series_list: pd.Series) -> pd.Series:
-    """Return the first non-null value across a set of Series."""
+    """Return the first non-null value across a set of index-aligned Series."""
     if not series_list:
         raise ValueError("No series provided to coalesce")
-    result = series_list[0]
-    for series in series_list[1:]:
-        result = result.combine_first(series)
-    return result
+    first = series_list[0]
+    if len(series_list) == 1:
+        return first
+    stacked = np.stack([np.asarray(series) for series in series_list])
+    # Rows with no value anywhere pick row 0, whose null is kept as-is.
+    source = pd.notna(stacked).argmax(axis=0)
+    return pd.Series(stacked[source, np.arange(stacked.shape[1])], index=first.index, name=first.name)
+
+
+def keys_in(left: pd.DataFrame, right: pd.DataFrame, keys: List[str]) -> np.ndarray:
+    """Return a mask of left rows whose key combination also appears in right."""
+    n_left = len(left)
+    pairs = np.zeros(n_left + len(right), dtype=np.int64)
+    for key in keys:
+        codes, uniques = pd.factorize(
+            pd.concat([left[key], right[key]], ignore_index=True), use_na_sentinel=False
+        )
+        pairs = pairs * len(uniques) + codes
+    return np.isin(pairs[:n_left], pairs[n_left:])
 
 
 def ensure_unique(df: pd.DataFrame, keys: List[str]) -> bool:
     """Return True if dataframe has unique keys."""
-    return df.duplicated(subset=keys).sum() == 0
+    return not df.duplicated(subset=keys).any()
 
 
 def fuzzy_task_suggestions(